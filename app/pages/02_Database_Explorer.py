@@ -10,6 +10,7 @@ import streamlit as st
 # Configuration
 # ----------------------------------------
 DB_PATH = os.path.join("artifacts", "conversation_memory.db")
+SESSION_PAGE_SIZE = 50
 
 st.set_page_config(
     page_title="Conversation Database Explorer",
@@ -23,33 +24,77 @@ st.caption("Browse, inspect, and audit saved conversations, translations, and RA
 # ----------------------------------------
 # Database connection helpers
 # ----------------------------------------
-def get_sessions():
-    """Return distinct session IDs and timestamps."""
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql_query(
-            """
-            SELECT DISTINCT session_id,
+@st.cache_resource(show_spinner=False)
+def get_conn():
+    """Create a persistent SQLite connection shared across reruns."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_sessions(before_end: str = None, limit: int = 50):
+    """
+    Return one page of sessions ending before `before_end` (newest first),
+    as (session_id, start_time, end_time, message_count) tuples.
+    """
+    cur = get_conn().execute(
+        """
+        SELECT session_id, start_time, end_time, message_count
+        FROM (
+            SELECT session_id,
                    MIN(timestamp) AS start_time,
                    MAX(timestamp) AS end_time,
                    COUNT(*) AS message_count
             FROM messages
             GROUP BY session_id
-            ORDER BY end_time DESC
-            """,
-            conn,
         )
-    return df
-
-
-def get_messages(session_id: str):
-    """Return all messages for a session ID."""
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql_query(
-            f"SELECT * FROM messages WHERE session_id = ? ORDER BY timestamp ASC",
-            conn,
-            params=(session_id,),
-        )
-    return df
+        WHERE ? IS NULL OR end_time < ?
+        ORDER BY end_time DESC
+        LIMIT ?
+        """,
+        (before_end, before_end, limit),
+    )
+    return cur.fetchall()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_messages(session_id: str, after_ts: str = "", limit: int = 50):
+    """Return one page of light message rows (keyset on timestamp)."""
+    return pd.read_sql_query(
+        """
+        SELECT id, speaker, substr(original, 1, 120) AS preview, timestamp
+        FROM messages
+        WHERE session_id = ? AND timestamp > ?
+        ORDER BY timestamp ASC
+        LIMIT ?
+        """,
+        get_conn(),
+        params=(session_id, after_ts, limit),
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_message_detail(message_id: int):
+    """Return the full text and parsed context for a single message."""
+    fields = ("original", "deidentified", "translation", "context")
+    row = get_conn().execute(
+        f"SELECT {', '.join(fields)} FROM messages WHERE id = ?",
+        (message_id,),
+    ).fetchone()
+    if not row:
+        return {}
+    detail = dict(zip(fields, row))
+    # Parse the context JSON once here so cached reruns skip json.loads
+    try:
+        detail["ctx_obj"] = json.loads(detail["context"]) if detail["context"] else {}
+        detail["ctx_error"] = None
+    except ValueError as e:
+        detail["ctx_obj"] = {}
+        detail["ctx_error"] = str(e)
+    return detail
 
 
 # ----------------------------------------
@@ -58,61 +103,116 @@ def get_messages(session_id: str):
 with st.sidebar:
     st.header("📚 Session List")
     st.markdown("Select a conversation session to view full details.")
+    if st.button("🔄 Refresh", use_container_width=True):
+        get_sessions.clear()
+        get_messages.clear()
+
+    # Stack of session-page cursors (last end_time of each previous page)
+    if "session_cursors" not in st.session_state:
+        st.session_state.session_cursors = []
+    session_cursor = st.session_state.session_cursors[-1] if st.session_state.session_cursors else None
+
     try:
-        sessions = get_sessions()
-        if sessions.empty:
+        sessions = get_sessions(session_cursor, SESSION_PAGE_SIZE)
+        if not sessions and st.session_state.session_cursors:
+            st.session_state.session_cursors.pop()
+            st.rerun()
+        if not sessions:
             st.warning("No sessions found yet. Start a conversation in the main app.")
             st.stop()
-        session_id = st.selectbox(
+        session_row = st.selectbox(
             "Choose a Session ID:",
-            sessions["session_id"],
-            format_func=lambda x: f"{x[:8]}... ({int(sessions.loc[sessions.session_id == x, 'message_count'])} msgs)",
+            sessions,
+            format_func=lambda r: f"{r[0][:8]}... ({r[3]} msgs)",
         )
+        session_id, start_time, end_time, message_count = session_row
     except Exception as e:
         st.error(f"Failed to read sessions: {e}")
         st.stop()
 
+    newer_col, older_col = st.columns(2)
+    with newer_col:
+        if st.session_state.session_cursors and st.button("← Newer", use_container_width=True):
+            st.session_state.session_cursors.pop()
+            st.rerun()
+    with older_col:
+        if len(sessions) == SESSION_PAGE_SIZE and st.button("Older sessions →", use_container_width=True):
+            st.session_state.session_cursors.append(sessions[-1][2])
+            st.rerun()
+
+    page_size = int(st.number_input("Page size", min_value=10, max_value=500, value=50, step=10))
+
 # ----------------------------------------
 # Load messages for selected session
 # ----------------------------------------
-df_msgs = get_messages(session_id)
+# Stack of page-start cursors; reset whenever the selected session changes.
+if st.session_state.get("cursor_session") != session_id:
+    st.session_state.cursor_session = session_id
+    st.session_state.cursor_stack = []
+cursor_ts = st.session_state.cursor_stack[-1] if st.session_state.cursor_stack else ""
+
+df_msgs = get_messages(session_id, cursor_ts, page_size)
 
 st.markdown(f"### 🧾 Session: `{session_id}`")
-st.write(f"**Messages:** {len(df_msgs)} | **Time range:** {df_msgs['timestamp'].min()} → {df_msgs['timestamp'].max()}")
+st.write(
+    f"**Messages:** {message_count} | "
+    f"**Time range:** {start_time} → {end_time}"
+)
+
+nav_prev, nav_next = st.columns(2)
+with nav_prev:
+    if st.session_state.cursor_stack and st.button("← Previous page"):
+        st.session_state.cursor_stack.pop()
+        st.rerun()
+with nav_next:
+    if len(df_msgs) == page_size and st.button("Load more →"):
+        st.session_state.cursor_stack.append(df_msgs["timestamp"].iloc[-1])
+        st.rerun()
 
 # ----------------------------------------
-# Iterate through messages
+# Message list + selected message detail
 # ----------------------------------------
-for _, row in df_msgs.iterrows():
-    role = "👨‍⚕️ Doctor" if row["speaker"] == "doctor" else "🧑‍🧍 Patient"
+df_view = df_msgs[["timestamp", "speaker", "preview"]]
+event = st.dataframe(
+    df_view,
+    use_container_width=True,
+    hide_index=True,
+    on_select="rerun",
+    selection_mode="single-row",
+    key="msg_table",
+)
 
-    with st.expander(f"{role}: {row['original'][:70]}{'...' if len(row['original']) > 70 else ''}", expanded=False):
-        st.markdown(f"**Original:** {row['original']}")
-        st.markdown(f"**De-identified:** {row.get('deidentified','')}")
-        st.markdown(f"**Translation:** {row['translation']}")
-        st.markdown(f"**Timestamp:** {row['timestamp']}")
-
-        # Parse and pretty print context JSON
-        ctx_text = row.get("context", "")
-        try:
-            ctx = json.loads(ctx_text) if ctx_text else {}
-            med = ctx.get("medical", [])
-            cult = ctx.get("cultural", [])
-            if med:
-                st.markdown("#### 🩺 Medical Context")
-                for m in med:
-                    st.markdown(f"- {m}")
-            if cult:
-                st.markdown("#### 🎭 Cultural Context")
-                for c in cult:
-                    st.markdown(f"- {c}")
-        except Exception as e:
-            st.write(f"(Invalid context JSON: {e})")
-
-        # Optional prompt view
-        if "prompt" in df_msgs.columns and row.get("prompt"):
-            with st.expander("🧠 Show Prompt Sent to LLM"):
-                st.code(row["prompt"], language="markdown")
+selected_rows = event.selection.rows if event else []
+if selected_rows:
+    row = df_msgs.iloc[selected_rows[0]]
+    role = "👨‍⚕️ Doctor" if row["speaker"] == "doctor" else "🧑‍🧍 Patient"
+    detail = get_message_detail(int(row["id"]))
+
+    st.markdown(f"#### {role} message")
+    st.markdown(f"**Original:** {detail.get('original', '')}")
+    st.markdown(f"**De-identified:** {detail.get('deidentified', '')}")
+    st.markdown(f"**Translation:** {detail.get('translation', '')}")
+    st.markdown(f"**Timestamp:** {row['timestamp']}")
+
+    # Pretty print the pre-parsed context JSON
+    ctx = detail.get("ctx_obj", {})
+    if detail.get("ctx_error"):
+        st.write(f"(Invalid context JSON: {detail['ctx_error']})")
+    med = ctx.get("medical", [])
+    cult = ctx.get("cultural", [])
+    if med:
+        st.markdown("#### 🩺 Medical Context")
+        for m in med:
+            st.markdown(f"- {m}")
+    if cult:
+        st.markdown("#### 🎭 Cultural Context")
+        for c in cult:
+            st.markdown(f"- {c}")
+
+    # Optional prompt view (stored inside the context JSON)
+    if ctx.get("llm_prompt"):
+        with st.expander("🧠 Show Prompt Sent to LLM"):
+            st.code(ctx["llm_prompt"], language="markdown")
 
 st.markdown("---")
-st.caption("💡 Tip: Expand each message to view detailed context and prompt text.")
+st.caption("💡 Tip: Select a row to view detailed context and prompt text.")
@@ -35,19 +35,35 @@ def list_tables():
     tables = [r[0] for r in cursor.fetchall()]
     return tables
 
+def _checked_table(table_name):
+    """Return the table name quoted as an identifier, if it is a known table."""
+    if table_name not in list_tables():
+        raise ValueError(f"Unknown table: {table_name!r}")
+    return f'"{table_name}"'
+
+@st.cache_data(show_spinner=False)
+def fetch_table_data(table_name, limit=1000, offset=0):
+    """Fetch one page of table contents as DataFrame."""
+    conn = get_connection()
+    cursor = conn.execute(
+        f"SELECT * FROM {_checked_table(table_name)} LIMIT ? OFFSET ?",
+        (limit, offset),
+    )
+    columns = [c[0] for c in cursor.description]
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
 @st.cache_data(show_spinner=False)
-def fetch_table_data(table_name):
-    """Fetch full table contents as DataFrame."""
+def count_table_rows(table_name):
+    """Return total row count for a table."""
     conn = get_connection()
-    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-    return df
+    cursor = conn.execute(f"SELECT COUNT(*) FROM {_checked_table(table_name)};")
+    return cursor.fetchone()[0]
 
 @st.cache_data(show_spinner=False)
 def fetch_table_schema(table_name):
     """Fetch schema info for a given table."""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table_name});")
+    cursor = conn.execute(f"PRAGMA table_info({_checked_table(table_name)});")
     schema = cursor.fetchall()
     return schema
 
@@ -69,8 +85,17 @@ with col1:
 with col2:
     if selected_table:
         st.subheader(f"📄 Data: `{selected_table}`")
-        df = fetch_table_data(selected_table)
-        st.write(f"**Total Rows:** {len(df)}")
+        total_rows = count_table_rows(selected_table)
+
+        size_col, page_col = st.columns(2)
+        with size_col:
+            page_size = int(st.number_input("Rows per page:", min_value=50, max_value=5000, value=1000, step=50))
+        page_count = max(1, -(-total_rows // page_size))
+        with page_col:
+            page = int(st.number_input("Page:", min_value=1, max_value=page_count, value=1, step=1))
+
+        df = fetch_table_data(selected_table, limit=page_size, offset=(page - 1) * page_size)
+        st.write(f"**Total Rows:** {total_rows} | **Page:** {page} of {page_count}")
 
         # Display DataFrame
         st.dataframe(
@@ -1,5 +1,7 @@
 import os
 import sys
+from html import escape
+
 import streamlit as st
 from streamlit.components.v1 import html
 
@@ -24,9 +26,9 @@ st.set_page_config(
 )
 
 # ----------------------------------------
-# Custom CSS
+# Custom CSS (static, built once at import)
 # ----------------------------------------
-st.markdown("""
+APP_CSS = """
 <style>
     body {font-family: 'Segoe UI', sans-serif;}
     .main-header {
@@ -67,13 +69,24 @@ st.markdown("""
         font-size: 0.8rem;
         color: #666;
     }
+    .ctx-details {
+        margin-top: 0.5rem;
+        font-size: 0.9rem;
+    }
+    .ctx-details summary {cursor: pointer; color: #333;}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # ----------------------------------------
-# Initialize Auth Manager
+# Initialize Auth Manager (shared across reruns + sessions)
 # ----------------------------------------
-auth = AuthManager()
+@st.cache_resource(show_spinner=False)
+def get_auth():
+    return AuthManager()
+
+auth = get_auth()
 
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -136,10 +149,12 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------------------------------
-# Init backend agents in session_state
+# Init backend agents (shared across sessions) + per-session state
 # ----------------------------------------
-if "coordinator" not in st.session_state:
-    st.session_state.coordinator = CoordinatorAgent()
+@st.cache_resource(show_spinner=False)
+def get_coordinator():
+    """Create one CoordinatorAgent shared by all browser sessions."""
+    return CoordinatorAgent()
 
 if "session_id" not in st.session_state:
     st.session_state.session_id = None
@@ -150,7 +165,7 @@ if "chat" not in st.session_state:
 if "summary_text" not in st.session_state:
     st.session_state.summary_text = None
 
-coordinator = st.session_state.coordinator
+coordinator = get_coordinator()
 
 # ----------------------------------------
 # Hindi Keyboard (Transliteration)
@@ -181,6 +196,61 @@ def enable_hindi_keyboard(textarea_dom_id: str):
     </script>
     """, height=0)
 
+# ----------------------------------------
+# Chat card rendering (one HTML block for the whole conversation)
+# ----------------------------------------
+def _context_html(ctx: dict) -> str:
+    medical = ctx.get("medical", [])
+    cultural = ctx.get("cultural", [])
+    if not medical and not cultural:
+        return "No specific context retrieved for this message."
+    parts = []
+    if medical:
+        items = "".join(f"<li>{_html_lines(m)}</li>" for m in medical)
+        parts.append(f"<b>🩺 Medical Context:</b><ul>{items}</ul>")
+    if cultural:
+        items = "".join(f"<li>{_html_lines(c)}</li>" for c in cultural)
+        parts.append(f"<b>🎭 Cultural Context:</b><ul>{items}</ul>")
+    return "".join(parts)
+
+
+def _html_lines(text: str) -> str:
+    """Escape text and turn newlines into <br>: a blank line would end the HTML block."""
+    return "<br>".join(escape(text).splitlines())
+
+
+def card_html(msg: dict) -> str:
+    role = msg["role"]
+    role_class = "doctor-msg" if role == "doctor" else "patient-msg"
+    role_label = "Doctor" if role == "doctor" else "Patient"
+    translated = _html_lines(msg.get("translated", ""))
+    ctx = msg.get("contexts", {"medical": [], "cultural": []})
+    intent_label = escape(msg.get("intent_label", ""))
+    intent_conf = msg.get("intent_conf", 0)
+
+    # No leading indentation: Markdown would treat indented lines as code
+    return (
+        f'<div class="chat-card {role_class}">'
+        f'<div class="role-header">{role_label}</div>'
+        f"<b>Original:</b><br>{_html_lines(msg['original'])}<br>"
+        f'<div class="translation"><b>Translated:</b> {translated}</div>'
+        f'<div class="small-label"><i>Intent:</i> {intent_label} ({intent_conf:.2f})</div>'
+        f'<details class="ctx-details"><summary>🔍 View retrieved medical &amp; cultural context</summary>'
+        f"{_context_html(ctx)}</details>"
+        f"</div>"
+    )
+
+def live_translation_preview():
+    """Return an on_token callback that renders the streaming translation."""
+    box = st.empty()
+    parts = []
+
+    def _on_token(delta: str):
+        parts.append(delta)
+        box.markdown(f"⏳ {''.join(parts)}")
+
+    return _on_token
+
 # ----------------------------------------
 # Layout: Doctor | Conversation | Patient
 # ----------------------------------------
@@ -208,7 +278,8 @@ with col_left:
             result = coordinator.process_message(
                 text=doctor_input.strip(),
                 speaker="doctor",
-                session_id=session_id
+                session_id=session_id,
+                on_token=live_translation_preview(),
             )
             if st.session_state.session_id is None:
                 st.session_state.session_id = result["session_id"]
@@ -245,7 +316,8 @@ with col_right:
             result = coordinator.process_message(
                 text=patient_input.strip(),
                 speaker="patient",
-                session_id=session_id
+                session_id=session_id,
+                on_token=live_translation_preview(),
             )
             if st.session_state.session_id is None:
                 st.session_state.session_id = result["session_id"]
@@ -266,38 +338,10 @@ with col_mid:
     if not st.session_state.chat:
         st.info("Start the conversation from either side to see translations and context here.")
     else:
-        for msg in st.session_state.chat:
-            role = msg["role"]
-            role_class = "doctor-msg" if role == "doctor" else "patient-msg"
-            role_label = "Doctor" if role == "doctor" else "Patient"
-            translated = msg.get("translated", "")
-            ctx = msg.get("contexts", {"medical": [], "cultural": []})
-            intent_label = msg.get("intent_label", "")
-            intent_conf = msg.get("intent_conf", 0)
-
-            st.markdown(f"""
-            <div class="chat-card {role_class}">
-                <div class="role-header">{role_label}</div>
-                <b>Original:</b><br>{msg['original']}<br>
-                <div class="translation"><b>Translated:</b> {translated}</div>
-                <div class="small-label"><i>Intent:</i> {intent_label} ({intent_conf:.2f})</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            with st.expander("🔍 View retrieved medical & cultural context", expanded=False):
-                medical = ctx.get("medical", [])
-                cultural = ctx.get("cultural", [])
-                if not medical and not cultural:
-                    st.write("No specific context retrieved for this message.")
-                else:
-                    if medical:
-                        st.markdown("**🩺 Medical Context:**")
-                        for m in medical:
-                            st.markdown(f"- {m}")
-                    if cultural:
-                        st.markdown("**🎭 Cultural Context:**")
-                        for c in cultural:
-                            st.markdown(f"- {c}")
+        st.markdown(
+            "\n".join(card_html(msg) for msg in st.session_state.chat),
+            unsafe_allow_html=True,
+        )
 
     # --- Summary generation area ---
     if st.button("🧠 Generate Summary", key="generate_summary_center"):
@@ -1,12 +1,24 @@
+import os
 import uuid
-from typing import Dict, Any, Optional
-
-from core.pii.pii_agent import PIIAnonymizer
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from core.pii.pii_agent import PIIAnonymizer, get_nlp_en
+from core.clients import get_openai_client
 from core.retrieval.rag_client import RAGClient
 from core.agents.translation_agent import TranslationAgent
 from core.agents.intent_classifier import IntentClassifier
 from core.db.session_manager import SessionManager
 
+# Max number of (speaker, de-identified text, summary) results kept for reuse
+MESSAGE_CACHE_SIZE = 512
+
+# Regenerate the session summary after this many new messages
+SUMMARIZE_EVERY = 6
+
 
 class CoordinatorAgent:
     """
@@ -24,11 +36,26 @@ class CoordinatorAgent:
 
     def __init__(self):
         self.pii = PIIAnonymizer()
+        get_nlp_en()  # load spaCy at startup rather than on the first message
         self.rag = RAGClient()
         self.translator = TranslationAgent()
         self.sessions = SessionManager()
         self.intent_classifier = IntentClassifier()  # 🧠 new mini LLM classifier
 
+        # Overlaps independent network calls (intent classification + query embedding)
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="coordinator-io")
+
+        # Background summarization (keeps LLM summary calls off the request path)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+        # Shared by every Streamlit session thread: both dicts under _summary_lock
+        self._pending_summary: Dict[str, Future] = {}
+        self._last_summarized_count: Dict[str, int] = {}
+        self._summary_lock = threading.Lock()
+
+        # LRU of intent + context + translation for repeated utterances
+        self._msg_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._msg_cache_lock = threading.Lock()
+
     # -------------------------------------------------
     def start_session(self, session_id: Optional[str] = None) -> str:
         """Create or register a new conversation session."""
@@ -44,8 +71,12 @@ class CoordinatorAgent:
         text: str,
         speaker: str,
         session_id: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
-        """Main entrypoint for each message."""
+        """
+        Main entrypoint for each message.
+        on_token, if given, receives translation text deltas as they stream in.
+        """
         if not text or not text.strip():
             raise ValueError("Empty message passed to CoordinatorAgent.")
 
@@ -60,32 +91,6 @@ class CoordinatorAgent:
         deid = pii_result.deidentified_text
         print(f"🛡️  De-identified: {deid}")
 
-        # 2️⃣ Intent classification – decide if medical RAG is needed
-        intent_result = self.intent_classifier.classify_intent(deid)
-        label = intent_result["label"]
-        conf = intent_result["confidence"]
-
-        # Log classification outcome to database
-        self.sessions.save_medical_rag_reflexion(session_id, deid, label, conf)
-
-        # 3️⃣ Conditional context retrieval
-        medical_ctx = []
-        cultural_ctx = []
-
-        if label in ["medical_required"]:
-            print("🩺 Medical context required → Running RAG retrieval")
-            contexts = self.rag.retrieve_context(deid)
-            medical_ctx = contexts.get("medical", [])
-            cultural_ctx = contexts.get("cultural", [])
-        else:
-            print(f"🚫 Skipping medical RAG retrieval ({label})")
-            # Always still fetch cultural context, lightweight
-            contexts = self.rag.retrieve_context(deid)
-            medical_ctx = ["Medical context: not required (small talk / non-clinical)."]
-            cultural_ctx = contexts.get("cultural", [])
-
-        print(f"🔍 Context Retrieved → Medical: {len(medical_ctx)}, Cultural: {len(cultural_ctx)}")
-
         # 🧠 Added: Retrieve existing conversation summary (persistent memory)
         conversation_summary = self.sessions.get_summary(session_id)
         if conversation_summary:
@@ -93,13 +98,25 @@ class CoordinatorAgent:
         else:
             print("⚠️ No prior summary → proceeding without memory context.")
 
-        # 4️⃣ Translation with context (+ memory)
-        t_result = self.translator.translate_with_context(
-            deid,
-            medical_context=medical_ctx,
-            cultural_context=cultural_ctx,
-            conversation_summary=conversation_summary,  # 🧠 Added
-        )
+        # 2️⃣–4️⃣ Intent → RAG → translation, reused for repeated utterances
+        cache_key = self._message_cache_key(deid, speaker, conversation_summary)
+        with self._msg_cache_lock:
+            cached = self._msg_cache.get(cache_key)
+            if cached is not None:
+                self._msg_cache.move_to_end(cache_key)
+
+        if cached is not None:
+            print("♻️ Repeated message → Reusing cached intent, context and translation.")
+            label, conf, medical_ctx, cultural_ctx, t_result = cached
+        else:
+            label, conf, medical_ctx, cultural_ctx, t_result = self._analyze_and_translate(
+                session_id, deid, conversation_summary, on_token
+            )
+            if t_result["translation"] != "(translation error)":
+                with self._msg_cache_lock:
+                    self._msg_cache[cache_key] = (label, conf, medical_ctx, cultural_ctx, t_result)
+                    if len(self._msg_cache) > MESSAGE_CACHE_SIZE:
+                        self._msg_cache.popitem(last=False)
 
         translation = t_result["translation"]
         prompt_used = t_result["prompt"]
@@ -124,24 +141,31 @@ class CoordinatorAgent:
             },
         }
 
-        self.sessions.save_message(
-            session_id=session_id,
-            speaker=speaker,
-            original=text,
-            deidentified=deid,
-            translation=translation,
-            context=record["context"],
-        )
-
-        # 🧠 Added: Auto-summarize once session has ≥ 2 messages
-        message_count = self.sessions.count_messages(session_id)
-        if message_count >= 2:
-            print(f"🧾 Session has {message_count} messages → Generating/Updating summary.")
-            try:
-                summary = self.summarize_session(session_id)
-                print(f"✅ Summary updated for session {session_id}")
-            except Exception as e:
-                print(f"⚠️ Summary generation failed: {e}")
+        with self.sessions.transaction():
+            # Log classification outcome (only when the classifier actually ran)
+            if cached is None:
+                self.sessions.save_medical_rag_reflexion(session_id, deid, label, conf)
+
+            message_count = self.sessions.save_message(
+                session_id=session_id,
+                speaker=speaker,
+                original=text,
+                deidentified=deid,
+                translation=translation,
+                context=record["context"],
+            )
+
+        # 🧠 Added: Auto-summarize once session has ≥ 2 messages,
+        # then only every SUMMARIZE_EVERY new messages
+        with self._summary_lock:
+            last_count = self._last_summarized_count.get(session_id)
+        if last_count is None:
+            summary_due = message_count >= 2
+        else:
+            summary_due = message_count - last_count >= SUMMARIZE_EVERY
+        if summary_due:
+            print(f"🧾 Session has {message_count} messages → Scheduling summary update.")
+            self._schedule_summary(session_id, message_count)
 
         # 6️⃣ Structured response for UI
         return {
@@ -160,33 +184,104 @@ class CoordinatorAgent:
             "llm_prompt": prompt_used,
         }
 
+    # -------------------------------------------------
+    @staticmethod
+    def _message_cache_key(deid: str, speaker: str, conversation_summary: Optional[str]) -> bytes:
+        """Fingerprint of everything that determines the translation output."""
+        h = hashlib.blake2b(digest_size=16)
+        for part in (speaker, deid, conversation_summary or ""):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.digest()
+
+    # -------------------------------------------------
+    def _analyze_and_translate(
+        self,
+        session_id: str,
+        deid: str,
+        conversation_summary: Optional[str],
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, float, List[str], List[str], Dict[str, Any]]:
+        """Run intent classification, conditional RAG retrieval and translation."""
+        # 2️⃣ Intent classification – decide if medical RAG is needed.
+        # The query embedding is computed concurrently so its latency hides
+        # behind the classifier; it is needed on both retrieval paths.
+        fut_emb = self._io_pool.submit(self.rag.embed_query, deid)
+        intent_result = self.intent_classifier.classify_intent(deid)
+        label = intent_result["label"]
+        conf = intent_result["confidence"]
+
+        # 3️⃣ Conditional context retrieval
+        medical_ctx = []
+        cultural_ctx = []
+        emb = fut_emb.result()
+
+        if label in ["medical_required"]:
+            print("🩺 Medical context required → Running RAG retrieval")
+            contexts = self.rag.retrieve_context(deid, embedding=emb)
+            medical_ctx = contexts.get("medical", [])
+            cultural_ctx = contexts.get("cultural", [])
+        else:
+            print(f"🚫 Skipping medical RAG retrieval ({label})")
+            # Still fetch cultural context only (no medical namespace query)
+            contexts = self.rag.retrieve_cultural_only(deid, embedding=emb)
+            medical_ctx = ["Medical context: not required (small talk / non-clinical)."]
+            cultural_ctx = contexts.get("cultural", [])
+
+        print(f"🔍 Context Retrieved → Medical: {len(medical_ctx)}, Cultural: {len(cultural_ctx)}")
+
+        # 4️⃣ Translation with context (+ memory)
+        t_result = self.translator.translate_with_context(
+            deid,
+            medical_context=medical_ctx,
+            cultural_context=cultural_ctx,
+            conversation_summary=conversation_summary,  # 🧠 Added
+            on_token=on_token,
+        )
+        return label, conf, medical_ctx, cultural_ctx, t_result
+
+    # -------------------------------------------------
+    def _schedule_summary(self, session_id: str, message_count: int):
+        """Run summarize_session in the background (one in flight per session)."""
+
+        def _summarize():
+            self.summarize_session(session_id)
+            # Only a saved summary counts: after a failure the next message retries
+            # and end_session still flushes. Set inside the task (not the done
+            # callback) so it lands before end_session's pending.result() returns.
+            with self._summary_lock:
+                self._last_summarized_count[session_id] = message_count
+
+        def _on_done(f: Future):
+            try:
+                f.result()
+                print(f"✅ Summary updated for session {session_id}")
+            except Exception as e:
+                print(f"⚠️ Summary generation failed: {e}")
+
+        # Check-then-submit under the lock so concurrent reruns can't double-submit
+        with self._summary_lock:
+            pending = self._pending_summary.get(session_id)
+            if pending is not None and not pending.done():
+                return
+            future = self._executor.submit(_summarize)
+            self._pending_summary[session_id] = future
+        future.add_done_callback(_on_done)
+
     # -------------------------------------------------
     def summarize_session(self, session_id: str, llm_client=None, model: str = None) -> str:
         """Optional: Summarize a full session using an LLM."""
-        from openai import OpenAI
-        from dotenv import load_dotenv
-        import os
-
         if llm_client is None:
-            load_dotenv()
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("Missing OPENAI_API_KEY for summarization.")
-            llm_client = OpenAI(api_key=api_key)
+            llm_client = get_openai_client()
 
         if model is None:
             model = os.getenv("OPENAI_MODEL", "gpt-4o")
 
-        conv = self.sessions.get_conversation(session_id)
-        if not conv:
+        lines = self.sessions.get_conversation_lines(session_id)
+        if not lines:
             raise ValueError(f"No messages found for session {session_id}")
 
-        convo_text = ""
-        for m in conv:
-            role = m["speaker"]
-            orig = m["original"]
-            trans = m["translation"] or ""
-            convo_text += f"{role.upper()}: {orig}\nEN/HIN: {trans}\n\n"
+        convo_text = "\n\n".join(lines)
 
         prompt = f"""
 You are a clinical documentation assistant.
@@ -221,8 +316,24 @@ Now provide the summary in clear English:
 
     # -------------------------------------------------
     def end_session(self, session_id: str):
-        """End the current session — placeholder for UI control."""
+        """End the current session — flushes the summary if new messages arrived."""
         if session_id:
+            with self._summary_lock:
+                pending = self._pending_summary.pop(session_id, None)
+            if pending is not None:
+                try:
+                    pending.result()
+                except Exception:
+                    pass  # already reported by the done callback
+
+            with self._summary_lock:
+                last_count = self._last_summarized_count.pop(session_id, 0)
+            message_count = self.sessions.count_messages(session_id)
+            if message_count >= 2 and message_count > last_count:
+                try:
+                    self.summarize_session(session_id)
+                except Exception as e:
+                    print(f"⚠️ Summary generation failed: {e}")
             print(f"🧾 Session {session_id} closed by user.")
         else:
             print("⚠️ No active session to close.")
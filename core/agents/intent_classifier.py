@@ -1,30 +1,235 @@
 # core/agents/intent_classifier.py
 import os
-from openai import OpenAI
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter, OrderedDict
 from dotenv import load_dotenv
 from datetime import datetime
 
+from core.clients import get_openai_client
+
 load_dotenv()
+log = logging.getLogger(__name__)
+
+# Persistent cache of previous classifications: append-only JSON lines of
+# [normalized message, result], last line wins, compacted on load
+INTENT_CACHE_PATH = os.path.join("artifacts", "intent_cache.jsonl")
+
+# Structured output: the API guarantees {"label": ..., "confidence": ...}
+INTENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "intent",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "label": {
+                    "type": "string",
+                    "enum": ["medical_required", "not_required", "small_talk"],
+                },
+                "confidence": {"type": "number"},
+            },
+            "required": ["label", "confidence"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Devanagari letters are kept whole (vowel signs/virama are not \w); danda (।॥) is punctuation
+_NON_WORD_RE = re.compile(r"[^\w\s\u0900-\u0963\u0966-\u097F]+")
+_SPACE_RE = re.compile(r"\s+")
+
+# -------------------------------------------------
+# Local prefilter: obvious cases are decided without an API call
+# -------------------------------------------------
+# Whole message is only a greeting / thanks / goodbye (optionally addressed)
+_GREETING_RE = re.compile(
+    r"^(?:hi|hii+|hello|hey|thanks|thank you|thank you so much|ok|okay|bye|goodbye"
+    r"|good (?:morning|afternoon|evening|night)|नमस्ते|नमस्कार|धन्यवाद|शुक्रिया|अलविदा)"
+    r"(?: (?:doctor|doc|sir|madam|ji|there|जी|डॉक्टर|साहब))?$"
+)
+
+# Unambiguous symptoms, illnesses and medications (English + Hindi).
+# Everyday words that are also body parts ("back", "head", "cold", "heart",
+# दिल, सिर, ...) are left out on purpose: those messages go to the LLM.
+_MEDICAL_TERMS_EN = (
+    "pain", "ache", "aches", "fever", "cough", "headache", "migraine", "nausea",
+    "vomit", "vomiting", "diarrhea", "constipation", "dizzy", "dizziness", "bleeding",
+    "blood", "rash", "itch", "itching", "swelling", "breathing", "wheezing", "fatigue",
+    "weakness", "numbness", "injury", "fracture", "stomach", "abdomen", "throat", "lungs",
+    "liver", "knee", "kidney", "urine", "diabetes", "asthma", "cancer", "infection", "allergy",
+    "allergic", "pregnant", "pregnancy", "hypertension", "medicine", "medication",
+    "pill", "pills", "insulin", "antibiotic", "antibiotics", "paracetamol", "ibuprofen",
+    "aspirin", "injection", "surgery", "symptom", "symptoms",
+)
+_MEDICAL_TERMS_HI = (
+    "दर्द", "बुखार", "खांसी", "खाँसी", "जुकाम", "सिरदर्द", "उल्टी", "दस्त", "कब्ज",
+    "खून", "सूजन", "खुजली", "सांस", "साँस", "थकान", "कमजोरी", "सीने", "छाती", "पेट", "कमर",
+    "घुटने", "घुटनों", "मधुमेह", "दमा", "कैंसर", "संक्रमण", "एलर्जी", "गर्भ",
+    "गर्भवती", "गर्भावस्था", "दवा", "दवाई", "दवाइयां", "दवाइयाँ", "इंजेक्शन", "डकार",
+)
+_MEDICAL_EN_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, _MEDICAL_TERMS_EN)) + r")\b")
+# \b is unreliable on Devanagari (vowel signs are not \w): match whole words by
+# requiring no Devanagari character on either side (so दिल्ली ≠ दिल, सिर्फ ≠ सिर)
+_MEDICAL_HI_RE = re.compile(
+    r"(?<![\u0900-\u097F])(?:"
+    + "|".join(map(re.escape, _MEDICAL_TERMS_HI))
+    + r")(?![\u0900-\u097F])"
+)
+
+
+def _normalize(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _SPACE_RE.sub(" ", _NON_WORD_RE.sub(" ", message.lower())).strip()
+
+
+def _trigrams(text: str) -> Counter:
+    """Character trigram profile used for cheap local similarity."""
+    padded = f" {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
 
 
 class IntentClassifier:
     """
     Lightweight LLM-based classifier that decides whether
     medical RAG retrieval is needed for a given message.
+
+    Obvious messages (pure greetings, known medical terms) are decided by a
+    local prefilter, and near-duplicates ("hello", "Hello!") are answered from
+    a local similarity cache (character trigrams) — both without calling the API.
     """
 
-    def __init__(self, model_name: str = "gpt-4o-mini"):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        cache_path: str = INTENT_CACHE_PATH,
+        similarity_threshold: float = 0.93,
+        cache_size: int = 512,
+    ):
+        self.client = get_openai_client()
         self.model = model_name
 
-    def classify_intent(self, message: str) -> dict:
-        """
-        Returns a structured dict:
-        {
-            "label": "medical_required" | "not_required" | "small_talk",
-            "confidence": float
-        }
-        """
+        self.cache_path = cache_path
+        self.similarity_threshold = similarity_threshold
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._cache_profiles = {}
+        self._cache_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._load_cache()
+
+    # -------------------------------------------------
+    def _load_cache(self):
+        """Warm the cache from disk (missing file → empty; bad lines skipped)."""
+        lines = 0
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        key, result = json.loads(line)
+                    except ValueError:
+                        continue  # e.g. a torn last line after a crash
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+        except OSError:
+            return
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        self._cache_profiles = {key: _trigrams(key) for key in self._cache}
+        # Log grew well past the live entries: rewrite it once, here at startup
+        if lines > 2 * self.cache_size:
+            self._compact_cache()
+
+    def _compact_cache(self):
+        try:
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, result in self._cache.items():
+                    f.write(json.dumps([key, result], ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            log.warning("⚠️ Could not compact intent cache: %s", e)
+
+    def _append_cache(self, key: str, result: dict):
+        """Persist one new entry: O(1) append, off the in-memory cache lock."""
+        line = json.dumps([key, result], ensure_ascii=False) + "\n"
+        try:
+            with self._file_lock, open(self.cache_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            log.warning("⚠️ Could not persist intent cache: %s", e)
+
+    def _cache_lookup(self, key: str):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            profile = _trigrams(key)
+            best_key, best_score = None, 0.0
+            for k, p in self._cache_profiles.items():
+                score = _cosine(profile, p)
+                if score > best_score:
+                    best_key, best_score = k, score
+            if best_key is not None and best_score >= self.similarity_threshold:
+                self._cache.move_to_end(best_key)
+                return self._cache[best_key]
+        return None
+
+    def _cache_add(self, key: str, result: dict):
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache_profiles[key] = _trigrams(key)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                old_key, _ = self._cache.popitem(last=False)
+                self._cache_profiles.pop(old_key, None)
+        self._append_cache(key, result)
+
+    # -------------------------------------------------
+    @staticmethod
+    def _prefilter(normalized: str):
+        """Return (label, confidence) for obvious messages, else None."""
+        if _MEDICAL_EN_RE.search(normalized) or _MEDICAL_HI_RE.search(normalized):
+            return "medical_required", 0.9
+        if _GREETING_RE.match(normalized):
+            return "not_required", 0.95
+        return None
+
+    # -------------------------------------------------
+    def _local_result(self, cache_key: str):
+        """Prefilter + cache lookup; returns a result dict or None."""
+        quick = self._prefilter(cache_key)
+        if quick is not None:
+            label, conf = quick
+            log.debug("🏷️ IntentClassifier (local rule) → %s (conf %s)", label.upper(), conf)
+            return {"label": label, "confidence": conf, "timestamp": datetime.utcnow().isoformat()}
+
+        cached = self._cache_lookup(cache_key) if cache_key else None
+        if cached is not None:
+            log.debug(
+                "🏷️ IntentClassifier (cached) → %s (conf %s)",
+                cached["label"].upper(), cached["confidence"],
+            )
+            return {**cached, "timestamp": datetime.utcnow().isoformat()}
+        return None
+
+    def _request(self, message: str) -> dict:
+        """Keyword arguments for the chat.completions.create call."""
         prompt = f"""
 You are a simple intent classifier for a bilingual medical assistant.
 
@@ -36,32 +241,54 @@ Classify into one of the following:
 - "not_required": if it's logistical, greeting, or non-medical ("hello", "thanks", "good morning").
 - "small_talk": if it's friendly conversation or unrelated to health.
 
-Respond strictly in JSON as:
-{{"label": "<one_of_above>", "confidence": <0_to_1_float>}}
+Also give your confidence as a number between 0 and 1.
 
 Message:
 \"{message}\"
 """.strip()
 
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You output a strict JSON classification."},
+                {"role": "user", "content": prompt},
+            ],
+            response_format=INTENT_RESPONSE_FORMAT,
+            temperature=0.0,
+            max_tokens=60,
+        )
+
+    def _parse_response(self, resp, cache_key: str):
+        """Extract (label, confidence) from the LLM response and cache it."""
+        raw = resp.choices[0].message.content.strip()
+        log.debug("🧭 IntentClassifier raw output: %s", raw)
+        parsed = json.loads(raw)
+        label = parsed.get("label", "medical_required")
+        conf = float(parsed.get("confidence", 0.7))
+        if cache_key:
+            self._cache_add(cache_key, {"label": label, "confidence": conf})
+        return label, conf
+
+    # -------------------------------------------------
+    def classify_intent(self, message: str) -> dict:
+        """
+        Returns a structured dict:
+        {
+            "label": "medical_required" | "not_required" | "small_talk",
+            "confidence": float
+        }
+        """
+        cache_key = _normalize(message)
+        local = self._local_result(cache_key)
+        if local is not None:
+            return local
+
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You output a strict JSON classification."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.0,
-                max_tokens=60,
-            )
-            raw = resp.choices[0].message.content.strip()
-            print(f"🧭 IntentClassifier raw output: {raw}")
-            import json
-            parsed = json.loads(raw)
-            label = parsed.get("label", "medical_required")
-            conf = float(parsed.get("confidence", 0.7))
+            resp = self.client.chat.completions.create(**self._request(message))
+            label, conf = self._parse_response(resp, cache_key)
         except Exception as e:
-            print("⚠️ Intent classification failed:", e)
+            log.warning("⚠️ Intent classification failed: %s", e)
             label, conf = "medical_required", 0.5
 
-        print(f"🏷️ IntentClassifier → {label.upper()} (conf {conf})")
+        log.debug("🏷️ IntentClassifier → %s (conf %s)", label.upper(), conf)
         return {"label": label, "confidence": conf, "timestamp": datetime.utcnow().isoformat()}
@@ -1,14 +1,23 @@
 import os
+import json
+import random
+import functools
+import logging
+import asyncio
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError
 from langdetect import detect
 from textwrap import shorten
 import re
 
+from core.clients import HTTP_LIMITS, HTTP_TIMEOUT, get_openai_client
+
 # -------------------------------------------------
 # Load environment variables
 # -------------------------------------------------
 load_dotenv()
+log = logging.getLogger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 SYSTEM_PROMPT = os.getenv("TRANSLATION_SYSTEM_PROMPT")
@@ -16,7 +25,82 @@ SYSTEM_PROMPT = os.getenv("TRANSLATION_SYSTEM_PROMPT")
 if not OPENAI_API_KEY:
     raise ValueError("❌ Missing OPENAI_API_KEY in .env")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Process-wide client (shared keep-alive HTTP/2 pool)
+client = get_openai_client()
+
+# Bulk translation limits (translate_many)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+MAX_RETRIES = 5
+
+# Total characters of retrieved snippets per prompt (~600-800 tokens)
+CONTEXT_CHAR_BUDGET = int(os.getenv("TRANSLATION_CONTEXT_CHARS", "2800"))
+
+
+class _RateLimiter:
+    """Spaces request starts evenly to stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / max(1, requests_per_minute)
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def _call_with_limits(api_client, request: dict, semaphore, limiter):
+    """chat.completions.create under a concurrency cap + RPM budget, retrying 429s."""
+    delay = 1.0
+    for attempt in range(MAX_RETRIES):
+        await limiter.wait()
+        async with semaphore:
+            try:
+                return await api_client.chat.completions.create(**request)
+            except RateLimitError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+        # Exponential backoff with jitter, outside the semaphore
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        delay *= 2
+
+
+# Static translation instructions (sent as part of the system message)
+TRANSLATION_GUIDANCE = """
+🧭 Translation Guidance:
+- Use the conversation summary to preserve context (age, symptoms, duration, etc.)
+- Do NOT do a word-by-word literal translation.
+- Use medical and cultural context to interpret the true meaning.
+- If idioms or cultural phrases appear, replace them with medically relevant equivalents.
+- Keep the tone clear, empathetic, and natural.
+- Ensure the translation would make sense to a clinician or patient.
+- Never include personal identifiers or unrelated details.
+
+Provide only the final translated sentence.
+""".strip()
+
+_DEVA = re.compile(r"[\u0900-\u097F]")
+
+
+@functools.lru_cache(maxsize=4096)
+def _detect_direction_cached(text: str) -> str:
+    """Translation direction for a message (memoized; langdetect is slow)."""
+    # Any Devanagari means Hindi input; no need to run langdetect
+    if _DEVA.search(text):
+        return "hi_to_en"
+    try:
+        lang = detect(text)
+        if lang in ["hi", "ne"]:
+            return "hi_to_en"
+        return "en_to_hi"
+    except Exception:
+        return "hi_to_en"
 
 
 class TranslationAgent:
@@ -34,22 +118,13 @@ class TranslationAgent:
         self.system_prompt = SYSTEM_PROMPT or (
             "You are a bilingual medical translation assistant."
         )
+        # Never varies between turns: keep every dynamic part out of it
+        self.system_message = f"{self.system_prompt}\n\n{TRANSLATION_GUIDANCE}"
 
     # -------------------------------------------------
     def _detect_direction(self, text: str) -> str:
         """Detect language to choose translation direction."""
-        try:
-            lang = detect(text)
-            if lang in ["hi", "ne"]:
-                return "hi_to_en"
-            elif lang == "en":
-                return "en_to_hi"
-            else:
-                if any("\u0900" <= c <= "\u097F" for c in text):
-                    return "hi_to_en"
-                return "en_to_hi"
-        except Exception:
-            return "hi_to_en"
+        return _detect_direction_cached(text)
 
     # -------------------------------------------------
     def _clean_summary(self, summary_text: str) -> str:
@@ -64,6 +139,29 @@ class TranslationAgent:
         # Truncate extremely long summaries if needed
         return cleaned[:1000]
 
+    # -------------------------------------------------
+    @staticmethod
+    def _pack_snippets(texts, limit: int, seen: set, budget: list):
+        """
+        Up to `limit` shortened "- snippet" lines, in retrieval (score) order.
+        Near-duplicates (same first 80 normalized chars) are skipped, and
+        snippets stop once the shared budget[0] characters are used up.
+        """
+        lines = []
+        for txt in texts:
+            if len(lines) >= limit:
+                break
+            key = " ".join(txt.lower().split())[:80]
+            if not key or key in seen:
+                continue
+            line = f"- {shorten(txt, width=350, placeholder='...')}"
+            if len(line) > budget[0]:
+                break
+            seen.add(key)
+            budget[0] -= len(line)
+            lines.append(line)
+        return lines
+
     # -------------------------------------------------
     def _build_prompt(
         self,
@@ -73,13 +171,20 @@ class TranslationAgent:
         cultural_context,
         conversation_summary: str = None
     ):
-        """Build a structured translation prompt."""
+        """
+        Build the per-turn (user message) part of the prompt.
+        Static instructions live in self.system_message so the request prefix
+        is identical across turns and eligible for OpenAI prompt caching.
+        """
 
+        # Medical first, then cultural, sharing one character budget
+        seen = set()
+        budget = [CONTEXT_CHAR_BUDGET]
         med_snippets = "\n".join(
-            [f"- {shorten(txt, width=350, placeholder='...')}" for txt in medical_context[:4]]
+            self._pack_snippets(medical_context, 4, seen, budget)
         )
         cult_snippets = "\n".join(
-            [f"- {shorten(txt, width=350, placeholder='...')}" for txt in cultural_context[:3]]
+            self._pack_snippets(cultural_context, 3, seen, budget)
         )
 
         direction_note = (
@@ -112,28 +217,18 @@ class TranslationAgent:
 🎭 Cultural Context:
 {cult_snippets or '(none found)'}
 
-🧭 Translation Guidance:
-- Use the conversation summary to preserve context (age, symptoms, duration, etc.)
-- Do NOT do a word-by-word literal translation.
-- Use medical and cultural context to interpret the true meaning.
-- If idioms or cultural phrases appear, replace them with medically relevant equivalents.
-- Keep the tone clear, empathetic, and natural.
-- Ensure the translation would make sense to a clinician or patient.
-- Never include personal identifiers or unrelated details.
-
-Now provide only the final translated sentence:
 """
         return prompt.strip()
 
     # -------------------------------------------------
-    def translate_with_context(
+    def _prepare(
         self,
         text: str,
         medical_context,
         cultural_context,
         conversation_summary: str = None
     ):
-        """Perform context-aware bidirectional translation."""
+        """Detect direction and build the prompt (shared by sync/async paths)."""
         direction = self._detect_direction(text)
         prompt = self._build_prompt(
             text,
@@ -143,30 +238,72 @@ Now provide only the final translated sentence:
             conversation_summary,
         )
 
-        # 🔍 Enhanced console output — visually confirm memory context
-        print(f"\n🧭 Translation direction: {direction}")
-        print("==============================================")
-        print("🧩 FINAL PROMPT SENT TO LLM:")
-        print("==============================================")
-        if conversation_summary:
-            print("✅ Conversation Memory INCLUDED in context.")
-        else:
-            print("⚠️ No conversation memory yet (first few turns).")
-        print(prompt)
-        print("==============================================\n")
-
-        try:
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=250,
+        # 🔍 Debug output — visually confirm memory context (formatted only if enabled)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "🧭 Translation direction: %s\n"
+                "==============================================\n"
+                "🧩 FINAL PROMPT SENT TO LLM:\n"
+                "==============================================\n"
+                "%s\n%s\n"
+                "==============================================",
+                direction,
+                "✅ Conversation Memory INCLUDED in context."
+                if conversation_summary
+                else "⚠️ No conversation memory yet (first few turns).",
+                prompt,
             )
 
-            translation = response.choices[0].message.content.strip()
+        return direction, prompt
+
+    def _request(self, prompt: str) -> dict:
+        """Keyword arguments for the chat.completions.create call."""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.system_message},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            max_tokens=250,
+        )
+
+    # -------------------------------------------------
+    def stream_translation(self, prompt: str):
+        """Yield translation text deltas as the model produces them."""
+        stream = client.chat.completions.create(**self._request(prompt), stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    # -------------------------------------------------
+    def translate_with_context(
+        self,
+        text: str,
+        medical_context,
+        cultural_context,
+        conversation_summary: str = None,
+        on_token=None,
+    ):
+        """
+        Perform context-aware bidirectional translation.
+        If on_token is given, the response is streamed and each text delta is
+        passed to it as it arrives; the full result dict is returned at the end.
+        """
+        direction, prompt = self._prepare(
+            text, medical_context, cultural_context, conversation_summary
+        )
+
+        try:
+            if on_token is None:
+                response = client.chat.completions.create(**self._request(prompt))
+                translation = response.choices[0].message.content.strip()
+            else:
+                parts = []
+                for delta in self.stream_translation(prompt):
+                    parts.append(delta)
+                    on_token(delta)
+                translation = "".join(parts).strip()
 
             return {
                 "translation": translation,
@@ -175,9 +312,139 @@ Now provide only the final translated sentence:
             }
 
         except Exception as e:
-            print("⚠️ Translation failed:", str(e))
+            log.warning("⚠️ Translation failed: %s", e)
             return {
                 "translation": "(translation error)",
                 "prompt": prompt,
                 "direction": direction,
             }
+
+    # -------------------------------------------------
+    async def atranslate_many(
+        self,
+        items,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+    ):
+        """
+        Translate many messages concurrently within rate limits.
+        Each item is a dict with "text" and optional "medical_context",
+        "cultural_context", "conversation_summary". Results keep input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limiter = _RateLimiter(requests_per_minute)
+
+        # Scoped client: an httpx.AsyncClient must not outlive its event loop
+        async with AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+        ) as api_client:
+
+            async def _one(item):
+                direction, prompt = self._prepare(
+                    item["text"],
+                    item.get("medical_context", []),
+                    item.get("cultural_context", []),
+                    item.get("conversation_summary"),
+                )
+                try:
+                    response = await _call_with_limits(
+                        api_client, self._request(prompt), semaphore, limiter
+                    )
+                    translation = response.choices[0].message.content.strip()
+                except Exception as e:
+                    log.warning("⚠️ Translation failed: %s", e)
+                    translation = "(translation error)"
+                return {
+                    "translation": translation,
+                    "prompt": prompt,
+                    "direction": direction,
+                }
+
+            return await asyncio.gather(*(_one(item) for item in items))
+
+    def translate_many(self, items, **limits):
+        """Sync wrapper around atranslate_many (not for use inside a running loop)."""
+        return asyncio.run(self.atranslate_many(items, **limits))
+
+    # -------------------------------------------------
+    # Offline batch path (OpenAI Batch API, ~50% cost, results within 24h)
+    # -------------------------------------------------
+    def submit_batch(self, texts, contexts=None, conversation_summary: str = None) -> str:
+        """
+        Submit many translations as one OpenAI batch job; returns the batch id.
+        contexts (optional) is a list aligned with texts of
+        {"medical": [...], "cultural": [...]} dicts (same shape as RAG output).
+        """
+        if contexts is None:
+            contexts = [{}] * len(texts)
+        if len(contexts) != len(texts):
+            raise ValueError("texts and contexts must have the same length")
+
+        lines = []
+        for i, (text, ctx) in enumerate(zip(texts, contexts)):
+            direction = self._detect_direction(text)
+            prompt = self._build_prompt(
+                text,
+                direction,
+                ctx.get("medical", []),
+                ctx.get("cultural", []),
+                conversation_summary,
+            )
+            lines.append(json.dumps({
+                "custom_id": f"{i}:{direction}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request(prompt),
+            }, ensure_ascii=False))
+
+        batch_file = client.files.create(
+            file=("translation_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        log.info("📦 Submitted translation batch %s (%d texts)", batch.id, len(texts))
+        return batch.id
+
+    # -------------------------------------------------
+    def poll_batch(self, batch_id: str):
+        """
+        Check a batch job. Returns None while it is still running, otherwise a
+        list of {"translation", "prompt", "direction"} dicts in submission order.
+        """
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Translation batch {batch_id} ended with status '{batch.status}'")
+        if batch.status != "completed":
+            return None
+
+        # Prompts are recovered from the input file; outputs come back unordered
+        prompts = {}
+        for line in client.files.content(batch.input_file_id).text.splitlines():
+            if line.strip():
+                req = json.loads(line)
+                prompts[req["custom_id"]] = req["body"]["messages"][-1]["content"]
+
+        outputs = {}
+        if batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                res = json.loads(line)
+                body = (res.get("response") or {}).get("body") or {}
+                choices = body.get("choices") or []
+                if choices:
+                    outputs[res["custom_id"]] = choices[0]["message"]["content"].strip()
+
+        results = []
+        for custom_id in sorted(prompts, key=lambda c: int(c.split(":", 1)[0])):
+            results.append({
+                "translation": outputs.get(custom_id, "(translation error)"),
+                "prompt": prompts[custom_id],
+                "direction": custom_id.split(":", 1)[1],
+            })
+        return results
@@ -1,18 +1,38 @@
+import os
+import time
 import sqlite3
+import hashlib
+import threading
 import bcrypt
 import datetime
+from collections import OrderedDict
 from typing import Optional
 
+# Successful password checks are reused for this long (seconds)
+VERIFY_CACHE_TTL = 300
+VERIFY_CACHE_SIZE = 1024
+
 
 class AuthManager:
     """Simple user authentication system using SQLite + bcrypt."""
 
     def __init__(self, db_path: str = "artifacts/conversation_memory.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._verify_key = os.urandom(32)
+        self._verified: "OrderedDict[bytes, float]" = OrderedDict()
+        self._verified_lock = threading.Lock()
         self._init_db()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        """Return this thread's cached connection (opened + tuned on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
 
     def _init_db(self):
         """Create users table if not exist."""
@@ -56,8 +76,37 @@ class AuthManager:
         if not row:
             return False
 
+        # Successful checks are remembered briefly; failures always pay the KDF
+        cache_key = self._verify_cache_key(username, password, row[0])
+        now = time.monotonic()
+        with self._verified_lock:
+            expires = self._verified.get(cache_key)
+            if expires is not None:
+                if expires > now:
+                    return True
+                del self._verified[cache_key]
+
         stored_hash = row[0].encode("utf-8")
-        return bcrypt.checkpw(password.encode("utf-8"), stored_hash)
+        ok = bcrypt.checkpw(password.encode("utf-8"), stored_hash)
+        if ok:
+            with self._verified_lock:
+                self._verified[cache_key] = now + VERIFY_CACHE_TTL
+                self._verified.move_to_end(cache_key)
+                while len(self._verified) > VERIFY_CACHE_SIZE:
+                    self._verified.popitem(last=False)
+        return ok
+
+    def _verify_cache_key(self, username: str, password: str, password_hash: str) -> bytes:
+        """
+        Keyed BLAKE2b fingerprint of the credentials + stored hash.
+        The per-process random key means the fingerprints are useless outside
+        this process; including the hash invalidates entries on password change.
+        """
+        h = hashlib.blake2b(key=self._verify_key, digest_size=16)
+        for part in (username, password, password_hash):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.digest()
 
     # -------------------------------------------------
     def user_exists(self, username: str) -> bool:
@@ -0,0 +1,52 @@
+"""
+Shared API clients.
+
+One OpenAI client and one Pinecone index handle per process, so every module
+reuses the same keep-alive HTTP/2 connection pools instead of paying a fresh
+TLS handshake per client. Built lazily on first use.
+"""
+
+import os
+import functools
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "agentic-med-hi-en")
+
+# Tuned HTTP pools: keep-alive + HTTP/2 multiplexing
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=50, keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def _require(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"❌ Missing {name} in .env")
+    return value
+
+
+@functools.lru_cache(maxsize=1)
+def get_openai_client():
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=_require("OPENAI_API_KEY"),
+        http_client=httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_pinecone():
+    from pinecone.grpc import PineconeGRPC
+
+    return PineconeGRPC(api_key=_require("PINECONE_API_KEY"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_index(name: str = PINECONE_INDEX_NAME):
+    return get_pinecone().Index(name)
@@ -1,7 +1,32 @@
 import sqlite3
 import json
 import datetime
-from typing import Optional, Dict, Any, List
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+
+class _TransactionConnection:
+    """
+    Connection wrapper handed out inside SessionManager.transaction().
+    Per-method commits and `with conn:` blocks become no-ops so the
+    outer COMMIT (or ROLLBACK) decides for all writes at once.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
 
 
 class SessionManager:
@@ -12,11 +37,45 @@ class SessionManager:
 
     def __init__(self, db_path: str = "artifacts/conversation_memory.db"):
         self.db_path = db_path
+        self._local = threading.local()
         self._init_db()
 
     # -------------------------------------------------
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        """Return this thread's cached connection (opened + tuned on first use)."""
+        tx_conn = getattr(self._local, "tx_conn", None)
+        if tx_conn is not None:
+            return tx_conn
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one BEGIN IMMEDIATE / COMMIT (one fsync)."""
+        if getattr(self._local, "tx_conn", None) is not None:
+            yield  # already inside a transaction on this thread
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.tx_conn = _TransactionConnection(conn)
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.tx_conn = None
 
     # -------------------------------------------------
     def _init_db(self):
@@ -67,24 +126,72 @@ class SessionManager:
         deidentified: str,
         translation: str,
         context: Dict[str, Any],
-    ):
-        """Save each message turn."""
+    ) -> int:
+        """
+        Save each message turn.
+        Returns the session's message count including this one
+        (via INSERT ... RETURNING, SQLite 3.35+).
+        """
         ts = datetime.datetime.utcnow().isoformat()
         with self._connect() as conn:
-            conn.execute("""
+            count = conn.execute("""
                 INSERT INTO messages (
                     session_id, timestamp, speaker, original, deidentified,
                     translation, context
                 ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                RETURNING (SELECT COUNT(*) FROM messages WHERE session_id = ?)
             """, (
                 session_id, ts, speaker, original, deidentified,
-                translation, json.dumps(context, ensure_ascii=False)
-            ))
+                translation, json.dumps(context, ensure_ascii=False, separators=(",", ":")),
+                session_id,
+            )).fetchone()[0]
             conn.execute(
                 "UPDATE sessions SET updated_at = ? WHERE id = ?",
                 (ts, session_id),
             )
             conn.commit()
+        return count
+
+    # -------------------------------------------------
+    def save_messages(
+        self,
+        session_id: str,
+        rows: List[Tuple[str, str, str, str, Dict[str, Any]]],
+    ) -> int:
+        """
+        Bulk-save message turns, e.g. when replaying a transcript.
+        Each row is (speaker, original, deidentified, translation, context).
+        Uses one executemany + one UPDATE in a single transaction.
+        Returns the number of rows saved.
+        """
+        if not rows:
+            return 0
+
+        # One clock read; per-row microsecond offsets keep timestamps ordered + unique
+        base = datetime.datetime.utcnow()
+        params = [
+            (
+                session_id,
+                (base + datetime.timedelta(microseconds=i)).isoformat(),
+                speaker, original, deidentified, translation,
+                json.dumps(context, ensure_ascii=False, separators=(",", ":")),
+            )
+            for i, (speaker, original, deidentified, translation, context) in enumerate(rows)
+        ]
+
+        with self.transaction():
+            conn = self._connect()
+            conn.executemany("""
+                INSERT INTO messages (
+                    session_id, timestamp, speaker, original, deidentified,
+                    translation, context
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, params)
+            conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE id = ?",
+                (params[-1][1], session_id),
+            )
+        return len(params)
 
     # -------------------------------------------------
     def get_conversation(self, session_id: str) -> List[Dict[str, Any]]:
@@ -99,6 +206,20 @@ class SessionManager:
                 for r in rows
             ]
 
+    # -------------------------------------------------
+    def get_conversation_lines(self, session_id: str) -> List[str]:
+        """Return each message pre-formatted as 'SPEAKER: original\nEN/HIN: translation'."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT upper(speaker) || ': ' || COALESCE(original, '')
+                       || char(10) || 'EN/HIN: ' || COALESCE(translation, '')
+                FROM messages WHERE session_id=? ORDER BY id ASC
+                """,
+                (session_id,)
+            ).fetchall()
+            return [r[0] for r in rows]
+
     # -------------------------------------------------
     def count_messages(self, session_id: str) -> int:
         """Return number of messages in a session."""
@@ -183,6 +304,18 @@ class SessionManager:
             )
             """)
 
+            # Indexes for per-session lookups ordered by time / insertion
+            # (SQLite does not index foreign keys automatically)
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session_ts ON messages(session_id, timestamp)"
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(timestamp)"
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)"
+            )
+
             conn.commit()
 
     # -------------------------------------------------
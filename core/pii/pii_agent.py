@@ -1,4 +1,5 @@
 import re
+import functools
 import spacy
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional
@@ -6,15 +7,31 @@ from typing import List, Dict, Optional
 # -------------------------------------------------
 # Load spaCy English model (for PERSON / basic NER)
 # -------------------------------------------------
-try:
-    nlp_en = spacy.load("en_core_web_sm")
-except OSError:
-    import subprocess, sys
-    subprocess.run(
-        ["python", "-m", "spacy", "download", "en_core_web_sm"],
-        check=False
-    )
-    nlp_en = spacy.load("en_core_web_sm")
+# Only the NER component is used; skip the rest of the pipeline.
+SPACY_DISABLED_PIPES = ["tagger", "parser", "lemmatizer", "attribute_ruler"]
+
+
+@functools.lru_cache(maxsize=1)
+def get_nlp_en():
+    """
+    Load en_core_web_sm once, on first use (importing this module stays cheap).
+    The model is installed via requirements.txt; nothing is downloaded here.
+    """
+    try:
+        return spacy.load("en_core_web_sm", disable=SPACY_DISABLED_PIPES)
+    except OSError as e:
+        raise OSError(
+            "spaCy model 'en_core_web_sm' is not installed. "
+            "Run: pip install -r requirements.txt "
+            "(or python -m spacy download en_core_web_sm)"
+        ) from e
+
+
+# Which entity wins when two detected spans overlap with equal length
+ENTITY_PRIORITY = {"phone": 0, "email": 1, "name": 2, "age": 3, "location": 4}
+
+# English PERSON names need a capital letter; pure Hindi input never has one
+_LATIN_UPPER_RE = re.compile(r"[A-Z]")
 
 
 # -------------------------------------------------
@@ -82,14 +99,16 @@ class PIIAnonymizer:
             ),
         ]
 
-        # Hindi age expressions: must mention साल/saal with age context
+        # Hindi age expressions: must mention साल/saal with age context.
+        # Trailing \b never matches after a vowel sign (हूँ, है end in non-\w),
+        # so the word end is "no letter follows" (danda ।॥ still counts as an end).
         self.hi_age_patterns = [
             re.compile(
-                r"\bउम्र\s*(\d{1,2})\s*(साल|saal)\b",
+                r"\bउम्र\s*(\d{1,2})\s*(साल|saal)(?![\w\u0900-\u0963\u0966-\u097F])",
                 re.IGNORECASE,
             ),
             re.compile(
-                r"\b(\d{1,2})\s*(साल|saal)\s*(का|की|के)\s*(?:हूँ|hai|है)\b",
+                r"\b(\d{1,2})\s*(साल|saal)\s*(का|की|के)\s*(?:हूँ|hai|है)(?![\w\u0900-\u0963\u0966-\u097F])",
                 re.IGNORECASE,
             ),
         ]
@@ -103,6 +122,20 @@ class PIIAnonymizer:
             ),
         ]
 
+        # All regex detectors folded into one alternation so the text is
+        # scanned once; order = priority when spans would overlap.
+        self.mega = re.compile(
+            "|".join(f"(?P<{k}>{p.pattern})" for k, p in self._named_patterns()),
+            re.IGNORECASE,
+        )
+        # Every detector needs a digit, an "@" or "नाम" to match at all
+        self.mega_gate = re.compile(r"[\d@]|नाम")
+        # Index of each detector's first inner capture group inside `mega`
+        self._value_groups = {
+            k: self.mega.groupindex[k] + (1 if p.groups else 0)
+            for k, p in self._named_patterns()
+        }
+
         # Placeholder counters
         self.counters = {
             "name": 1,
@@ -126,135 +159,79 @@ class PIIAnonymizer:
           - list of PIIEntity
         existing_map (placeholder -> value) can be used to keep stable IDs across turns.
         """
+        ents = get_nlp_en()(text).ents if _LATIN_UPPER_RE.search(text) else ()
+        return self._deidentify(text, ents, existing_map)
+
+    def deidentify_batch(
+        self,
+        texts: List[str],
+        existing_map: Optional[Dict[str, str]] = None,
+    ) -> List[DeidentificationResult]:
+        """
+        De-identify many texts at once (e.g. a whole session).
+        spaCy runs once over the texts that need NER via nlp.pipe;
+        results come back in input order.
+        """
+        ner_idx = [i for i, t in enumerate(texts) if _LATIN_UPPER_RE.search(t)]
+        ents_by_idx = {
+            i: doc.ents
+            for i, doc in zip(
+                ner_idx,
+                get_nlp_en().pipe((texts[i] for i in ner_idx), batch_size=64, n_process=1),
+            )
+        }
+        return [
+            self._deidentify(text, ents_by_idx.get(i, ()), existing_map)
+            for i, text in enumerate(texts)
+        ]
+
+    def _deidentify(
+        self,
+        text: str,
+        ents,
+        existing_map: Optional[Dict[str, str]],
+    ) -> DeidentificationResult:
+        """Shared body of deidentify/deidentify_batch given precomputed spaCy ents."""
         if existing_map is None:
             existing_map = {}
 
         entities: List[PIIEntity] = []
 
         # ---------- 1. English NER for PERSON ----------
-        doc = nlp_en(text)
-        for ent in doc.ents:
+        for ent in ents:
             if ent.label_ == "PERSON":
-                placeholder = self._get_or_create_placeholder(
-                    "name", ent.text, existing_map
-                )
                 entities.append(
-                    PIIEntity(
-                        type="name",
-                        value=ent.text,
-                        placeholder=placeholder,
-                        start=ent.start_char,
-                        end=ent.end_char,
-                    )
+                    self._entity("name", ent.text, ent.start_char, ent.end_char, existing_map)
                 )
 
-        # ---------- 2. Hindi explicit name patterns ----------
-        for pat in self.hi_name_patterns:
-            for m in pat.finditer(text):
-                name = m.group(1).strip()
-                if len(name) > 1:
-                    placeholder = self._get_or_create_placeholder(
-                        "name", name, existing_map
-                    )
-                    entities.append(
-                        PIIEntity(
-                            type="name",
-                            value=name,
-                            placeholder=placeholder,
-                            start=m.start(1),
-                            end=m.end(1),
-                        )
-                    )
-
-        # ---------- 3. Phone numbers ----------
-        phone_spans = []
-        for m in self.phone_pattern.finditer(text):
-            raw = m.group(1).strip()
-            digits = re.sub(r"\D", "", raw)
-            if len(digits) >= 10:
-                placeholder = self._get_or_create_placeholder(
-                    "phone", raw, existing_map
-                )
-                start, end = m.start(1), m.end(1)
-                phone_spans.append((start, end))
-                entities.append(
-                    PIIEntity(
-                        type="phone",
-                        value=raw,
-                        placeholder=placeholder,
-                        start=start,
-                        end=end,
-                    )
-                )
+        # ---------- 2. Regex detectors (single pass) ----------
+        matches = self.mega.finditer(text) if self.mega_gate.search(text) else ()
+        for m in matches:
+            kind = m.lastgroup
+            g = self._value_groups[kind]
+            value, start, end = m.group(g), m.start(g), m.end(g)
 
-        # ---------- 4. Emails ----------
-        for m in self.email_pattern.finditer(text):
-            email = m.group(0)
-            placeholder = self._get_or_create_placeholder(
-                "email", email, existing_map
-            )
-            entities.append(
-                PIIEntity(
-                    type="email",
-                    value=email,
-                    placeholder=placeholder,
-                    start=m.start(),
-                    end=m.end(),
-                )
-            )
-
-        # ---------- 5. Ages (with strong context only) ----------
-        # English age mentions
-        for pat in self.en_age_patterns:
-            for m in pat.finditer(text):
-                num = m.group(1)
-                if not num:
+            if kind.startswith("hi_name"):
+                name = value.strip()
+                if len(name) <= 1:
                     continue
-                if not (0 < int(num) < 120):
-                    continue
-                start, end = m.start(1), m.end(1)
-                if self._inside_spans(start, phone_spans):
-                    continue  # don't mis-tag inside phone numbers
-                placeholder = self._get_or_create_placeholder(
-                    "age", num, existing_map
-                )
-                entities.append(
-                    PIIEntity(
-                        type="age",
-                        value=num,
-                        placeholder=placeholder,
-                        start=start,
-                        end=end,
-                    )
-                )
+                entities.append(self._entity("name", name, start, end, existing_map))
 
-        # Hindi age mentions
-        for pat in self.hi_age_patterns:
-            for m in pat.finditer(text):
-                num = m.group(1)
-                if not num:
-                    continue
-                if not (0 < int(num) < 120):
-                    continue
-                start, end = m.start(1), m.end(1)
-                if self._inside_spans(start, phone_spans):
+            elif kind == "phone":
+                raw = value.strip()
+                if len(re.sub(r"\D", "", raw)) >= 10:
+                    entities.append(self._entity("phone", raw, start, end, existing_map))
+
+            elif kind == "email":
+                entities.append(self._entity("email", value, start, end, existing_map))
+
+            else:  # en_age_* / hi_age_* (strong context only)
+                if not value or not (0 < int(value) < 120):
                     continue
-                placeholder = self._get_or_create_placeholder(
-                    "age", num, existing_map
-                )
-                entities.append(
-                    PIIEntity(
-                        type="age",
-                        value=num,
-                        placeholder=placeholder,
-                        start=start,
-                        end=end,
-                    )
-                )
+                entities.append(self._entity("age", value, start, end, existing_map))
 
-        # ---------- 6. Clean up + apply replacements ----------
+        # ---------- 3. Clean up + apply replacements ----------
         entities = self._deduplicate_entities(entities)
-        entities.sort(key=lambda e: e.start)
 
         deidentified_text = self._apply_replacements(text, entities)
 
@@ -267,11 +244,33 @@ class PIIAnonymizer:
     # -------------------------------------------------
     # Helpers
     # -------------------------------------------------
-    def _inside_spans(self, idx: int, spans: List[tuple]) -> bool:
-        for s, e in spans:
-            if s <= idx < e:
-                return True
-        return False
+    def _named_patterns(self):
+        """(group name, compiled pattern) pairs, in match-priority order."""
+        yield "phone", self.phone_pattern
+        yield "email", self.email_pattern
+        for i, pat in enumerate(self.hi_name_patterns, 1):
+            yield f"hi_name_{i}", pat
+        for i, pat in enumerate(self.en_age_patterns, 1):
+            yield f"en_age_{i}", pat
+        for i, pat in enumerate(self.hi_age_patterns, 1):
+            yield f"hi_age_{i}", pat
+
+    def _entity(
+        self,
+        ent_type: str,
+        value: str,
+        start: int,
+        end: int,
+        existing_map: Dict[str, str],
+    ) -> PIIEntity:
+        placeholder = self._get_or_create_placeholder(ent_type, value, existing_map)
+        return PIIEntity(
+            type=ent_type,
+            value=value,
+            placeholder=placeholder,
+            start=start,
+            end=end,
+        )
 
     def _get_or_create_placeholder(
         self,
@@ -291,22 +290,41 @@ class PIIAnonymizer:
         return ph
 
     def _deduplicate_entities(self, entities: List[PIIEntity]) -> List[PIIEntity]:
+        """
+        Collapse same-span duplicates and resolve overlaps so replacements
+        never clash. On overlap the longer span wins, then the type priority.
+        Returns entities sorted by start.
+        """
         unique = []
         seen = set()
         for e in entities:
-            key = (e.start, e.end, e.type, e.placeholder)
+            key = (e.start, e.end, e.type)
             if key not in seen:
                 seen.add(key)
                 unique.append(e)
-        return unique
+
+        unique.sort(
+            key=lambda e: (e.start, -(e.end - e.start), ENTITY_PRIORITY.get(e.type, 99))
+        )
+        merged: List[PIIEntity] = []
+        for e in unique:
+            if merged and e.start < merged[-1].end:
+                last = merged[-1]
+                e_rank = (e.end - e.start, -ENTITY_PRIORITY.get(e.type, 99))
+                last_rank = (last.end - last.start, -ENTITY_PRIORITY.get(last.type, 99))
+                if e_rank > last_rank:
+                    merged[-1] = e
+                continue
+            merged.append(e)
+        return merged
 
     def _apply_replacements(self, text: str, entities: List[PIIEntity]) -> str:
-        """Apply replacements left-to-right with offset tracking."""
-        result = text
-        offset = 0
+        """Build the output in one pass from the sorted, non-overlapping entities."""
+        parts = []
+        prev = 0
         for e in entities:
-            s = e.start + offset
-            t = e.end + offset
-            result = result[:s] + e.placeholder + result[t:]
-            offset += len(e.placeholder) - (e.end - e.start)
-        return result
+            parts.append(text[prev:e.start])
+            parts.append(e.placeholder)
+            prev = e.end
+        parts.append(text[prev:])
+        return "".join(parts)
@@ -0,0 +1,142 @@
+import os
+import json
+import sqlite3
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Where RAGClient keeps its embedding + semantic caches between restarts
+RAG_CACHE_DB = os.getenv("RAG_CACHE_DB", os.path.join("artifacts", "rag_cache.db"))
+# Semantic results older than this are not reloaded (seconds; default 7 days)
+SEMANTIC_MAX_AGE = float(os.getenv("RAG_SEMANTIC_MAX_AGE", str(7 * 24 * 3600)))
+
+
+class RAGCacheStore:
+    """
+    SQLite persistence for RAGClient caches, so a restarted app starts warm.
+
+    - embeds:   (model, normalized text) -> embedding, packed float16 (~6KB/row)
+    - semantic: int8 query codes + scale -> retrieval result JSON, per scope
+                (scope = model + index + namespace/top_k config the result came
+                from), timestamped so stale rows expire; cleared on index rebuild
+    """
+
+    def __init__(self, db_path: str = RAG_CACHE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self):
+        """Return this thread's cached connection (opened + tuned on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeds (
+                    text_hash BLOB PRIMARY KEY,
+                    model TEXT,
+                    vec BLOB
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS semantic (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT,
+                    codes BLOB,
+                    scale REAL,
+                    result TEXT,
+                    created_at REAL DEFAULT 0
+                )
+            """)
+            # Tables from before created_at existed: old rows count as expired
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(semantic)")}
+            if "created_at" not in columns:
+                conn.execute("ALTER TABLE semantic ADD COLUMN created_at REAL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_semantic_scope ON semantic(scope, id)")
+
+    @staticmethod
+    def _text_hash(model: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model}\x00{text}".encode("utf-8"), digest_size=16).digest()
+
+    # -------------------------------------------------
+    # Embeddings
+    # -------------------------------------------------
+    def get_embedding(self, model: str, text: str) -> Optional[List[float]]:
+        row = self._connect().execute(
+            "SELECT vec FROM embeds WHERE text_hash = ?",
+            (self._text_hash(model, text),),
+        ).fetchone()
+        if not row:
+            return None
+        return np.frombuffer(row[0], dtype=np.float16).astype(np.float32).tolist()
+
+    def put_embeddings(self, model: str, items: List[Tuple[str, List[float]]]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeds (text_hash, model, vec) VALUES (?, ?, ?)",
+                [
+                    (self._text_hash(model, text), model, np.asarray(vec, dtype=np.float16).tobytes())
+                    for text, vec in items
+                ],
+            )
+
+    # -------------------------------------------------
+    # Semantic cache
+    # -------------------------------------------------
+    def load_semantic(self, scope: str, limit: int, max_age: float = SEMANTIC_MAX_AGE):
+        """Newest `limit` unexpired entries for scope, oldest first: [(codes, scale, result)]."""
+        rows = self._connect().execute(
+            """
+            SELECT codes, scale, result FROM semantic
+            WHERE scope = ? AND created_at >= ?
+            ORDER BY id DESC LIMIT ?
+            """,
+            (scope, time.time() - max_age, limit),
+        ).fetchall()
+        return [
+            (np.frombuffer(codes, dtype=np.int8), scale, json.loads(result))
+            for codes, scale, result in reversed(rows)
+        ]
+
+    def add_semantic(
+        self,
+        scope: str,
+        codes: np.ndarray,
+        scale: float,
+        result: Dict[str, List[str]],
+        keep: int,
+    ) -> None:
+        """Append one entry and trim the scope to its newest `keep` rows."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO semantic (scope, codes, scale, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    scope, codes.tobytes(), float(scale),
+                    json.dumps(result, ensure_ascii=False), time.time(),
+                ),
+            )
+            conn.execute(
+                """
+                DELETE FROM semantic WHERE scope = ? AND id <= (
+                    SELECT id FROM semantic WHERE scope = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (scope, scope, keep),
+            )
+
+    def clear_semantic(self) -> None:
+        """Drop every cached retrieval result (run after the index is rebuilt)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM semantic")
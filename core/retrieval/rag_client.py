@@ -1,18 +1,27 @@
 import os
-from typing import Dict, List, Any
-
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
-from pinecone import Pinecone
-from textwrap import shorten
+from core.clients import get_index, get_openai_client
+from core.retrieval.rag_cache import RAG_CACHE_DB, RAGCacheStore
 
 load_dotenv()
+log = logging.getLogger(__name__)
 
 # ------------ ENV ------------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-large")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "agentic-med-hi-en")
+# Optional single namespace holding both datasets, tagged by metadata["type"]
+PINECONE_COMBINED_NAMESPACE = os.getenv("PINECONE_COMBINED_NAMESPACE")
 
 if not OPENAI_API_KEY:
     raise ValueError("❌ Missing OPENAI_API_KEY in .env")
@@ -20,9 +29,33 @@ if not PINECONE_API_KEY:
     raise ValueError("❌ Missing PINECONE_API_KEY in .env")
 
 # ------------ Clients ------------
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+openai_client = get_openai_client()
+index = get_index(PINECONE_INDEX_NAME)
+
+# Overlaps the per-namespace Pinecone queries (I/O bound, thread-safe client)
+_RAG_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-query")
+
+# Combined-namespace queries fetch this many times (top_k_medical + top_k_cultural)
+COMBINED_OVERFETCH = 2
+
+# Distinct query texts whose embeddings are kept in memory
+EMBED_CACHE_SIZE = 4096
+# Verbatim (normalized) queries whose retrieval results are kept in memory
+RESULT_CACHE_SIZE = 1024
+
+
+# Medical snippet templates, bound once and filled per match
+_MED_WITH_SOURCE = "[{src} | {lang}] {text}".format
+_MED_PLAIN = "{text}".format
+_MED_NO_TEXT = "(No text) from {src}".format
+
+
+def _truncate(s: str, w: int = 400) -> str:
+    """Cap a snippet at w chars, cutting at a word boundary and marking it with ' ...'."""
+    if len(s) <= w:
+        return s
+    cut = s.rfind(" ", 0, w - 4)
+    return s[:cut if cut > 0 else w - 4] + " ..."
 
 
 class RAGClient:
@@ -40,20 +73,194 @@ class RAGClient:
         cultural_namespace: str = "cultural_semantics",
         top_k_medical: int = 4,
         top_k_cultural: int = 3,
+        similarity_threshold: float = 0.95,
+        semantic_cache_size: int = 512,
+        combined_namespace: Optional[str] = PINECONE_COMBINED_NAMESPACE,
+        cache_db: Optional[str] = RAG_CACHE_DB,
     ):
         self.medical_ns = medical_namespace
         self.cultural_ns = cultural_namespace
+        self.combined_ns = combined_namespace  # set → one query per retrieval
         self.top_k_medical = top_k_medical
         self.top_k_cultural = top_k_cultural
 
+        # Query embedding LRU (normalized text -> vector), shared across threads
+        self._embed_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._embed_lock = threading.Lock()
+
+        # Exact-match result LRU: repeated queries skip embedding + Pinecone
+        self._result_cache: "OrderedDict[bytes, Dict[str, List[str]]]" = OrderedDict()
+        self._result_lock = threading.Lock()
+
+        # Semantic cache: paraphrased queries reuse an earlier retrieval result.
+        # Ring buffer of L2-normalized query vectors, scalar-quantized to int8
+        # rows with a per-row scale (4x smaller than float32), + their results.
+        self.similarity_threshold = similarity_threshold
+        self._sem_capacity = semantic_cache_size
+        self._sem_vecs: Optional[np.ndarray] = None  # int8, allocated on first use
+        self._sem_scales = np.ones(semantic_cache_size, dtype=np.float32)
+        self._sem_results: List[Optional[Dict[str, List[str]]]] = [None] * semantic_cache_size
+        self._sem_size = 0
+        self._sem_next = 0
+        self._sem_lock = threading.Lock()
+
+        # On-disk copy of both caches (None disables persistence)
+        self._store: Optional[RAGCacheStore] = None
+        self._sem_scope = "|".join(map(str, (
+            OPENAI_EMBED_MODEL, PINECONE_INDEX_NAME,
+            self.medical_ns, self.cultural_ns, self.combined_ns,
+            self.top_k_medical, self.top_k_cultural,
+        )))
+        if cache_db:
+            try:
+                self._store = RAGCacheStore(cache_db)
+                for codes, scale, result in self._store.load_semantic(
+                    self._sem_scope, self._sem_capacity
+                ):
+                    self._semantic_insert(codes, scale, result)
+            except sqlite3.Error as e:
+                log.warning("⚠️ RAG cache disabled (%s): %s", cache_db, e)
+                self._store = None
+
+    # -------------------------------------------------
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Cache key only (lowercased, whitespace collapsed); never sent to the API."""
+        return " ".join(text.lower().split())
+
+    def _embed_cache_get(self, key: str):
+        with self._embed_lock:
+            vec = self._embed_cache.get(key)
+            if vec is not None:
+                self._embed_cache.move_to_end(key)
+            return vec
+
+    def _embed_cache_put(self, key: str, vec) -> None:
+        with self._embed_lock:
+            self._embed_cache[key] = tuple(vec)
+            self._embed_cache.move_to_end(key)
+            while len(self._embed_cache) > EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+
     # -------------------------------------------------
     def _embed(self, text: str) -> List[float]:
-        """Create embedding for query text."""
-        resp = openai_client.embeddings.create(
-            model=OPENAI_EMBED_MODEL,
-            input=[text],
-        )
-        return resp.data[0].embedding
+        """
+        Unit-length embedding for query text (served from the LRU when seen
+        before). Unit vectors make Pinecone dot-product scores cosines.
+        """
+        key = self._normalize(text)
+        vec = self._embed_cache_get(key)
+        if vec is None:
+            vec = self._disk_get_embedding(key)
+            if vec is None:
+                resp = openai_client.embeddings.create(
+                    model=OPENAI_EMBED_MODEL,
+                    input=[text],
+                )
+                vec = self._unit(resp.data[0].embedding).tolist()
+                self._disk_put_embeddings([(key, vec)])
+            self._embed_cache_put(key, vec)
+        return list(vec)
+
+    # -------------------------------------------------
+    def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts with at most ONE embeddings call (cache misses only).
+        Results are returned in input order.
+        """
+        keys = [self._normalize(t) for t in texts]
+        originals = dict(zip(reversed(keys), reversed(texts)))  # first text per key
+        vecs = {k: self._embed_cache_get(k) for k in keys}
+        for k, v in vecs.items():
+            if v is None:
+                vecs[k] = self._disk_get_embedding(k)
+                if vecs[k] is not None:
+                    self._embed_cache_put(k, vecs[k])
+        misses = [k for k, v in vecs.items() if v is None]
+
+        if misses:
+            resp = openai_client.embeddings.create(
+                model=OPENAI_EMBED_MODEL,
+                input=[originals[k] for k in misses],
+            )
+            for k, d in zip(misses, resp.data):
+                vecs[k] = self._unit(d.embedding).tolist()
+                self._embed_cache_put(k, vecs[k])
+            self._disk_put_embeddings([(k, vecs[k]) for k in misses])
+
+        return [list(vecs[k]) for k in keys]
+
+    # -------------------------------------------------
+    def _disk_get_embedding(self, key: str):
+        if self._store is None:
+            return None
+        try:
+            return self._store.get_embedding(OPENAI_EMBED_MODEL, key)
+        except sqlite3.Error as e:
+            log.warning("⚠️ RAG cache read failed: %s", e)
+            return None
+
+    def _disk_put_embeddings(self, items) -> None:
+        if self._store is None:
+            return
+        try:
+            self._store.put_embeddings(OPENAI_EMBED_MODEL, items)
+        except sqlite3.Error as e:
+            log.warning("⚠️ RAG cache write failed: %s", e)
+
+    # -------------------------------------------------
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text so callers can overlap it with other work."""
+        return self._embed(text)
+
+    # -------------------------------------------------
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    @staticmethod
+    def _quantize(unit: np.ndarray):
+        """int8 codes + scale such that unit ≈ codes / scale."""
+        peak = float(np.abs(unit).max())
+        scale = 127.0 / peak if peak else 1.0
+        return np.rint(unit * scale).astype(np.int8), np.float32(scale)
+
+    def _semantic_lookup(self, unit: np.ndarray) -> Optional[Dict[str, List[str]]]:
+        """Cached result of the most similar earlier query, if close enough."""
+        q_codes, q_scale = self._quantize(unit)
+        with self._sem_lock:
+            if not self._sem_size:
+                return None
+            n = self._sem_size
+            # int32 accumulation: 3072 products of up to 127*127 overflow int16
+            dots = self._sem_vecs[:n] @ q_codes.astype(np.int32)
+            scores = dots / (self._sem_scales[:n] * q_scale)
+            best = int(scores.argmax())
+            if scores[best] < self.similarity_threshold:
+                return None
+            result = self._sem_results[best]
+        return {k: list(v) for k, v in result.items()}
+
+    def _semantic_insert(self, codes: np.ndarray, scale, result: Dict[str, List[str]]) -> None:
+        with self._sem_lock:
+            if self._sem_vecs is None:
+                self._sem_vecs = np.zeros((self._sem_capacity, codes.shape[0]), dtype=np.int8)
+            slot = self._sem_next
+            self._sem_vecs[slot], self._sem_scales[slot] = codes, scale
+            self._sem_results[slot] = result
+            self._sem_next = (slot + 1) % self._sem_capacity
+            self._sem_size = min(self._sem_size + 1, self._sem_capacity)
+
+    def _semantic_store(self, unit: np.ndarray, result: Dict[str, List[str]]) -> None:
+        codes, scale = self._quantize(unit)
+        self._semantic_insert(codes, scale, result)
+        if self._store is not None:
+            try:
+                self._store.add_semantic(self._sem_scope, codes, scale, result, self._sem_capacity)
+            except sqlite3.Error as e:
+                log.warning("⚠️ RAG cache write failed: %s", e)
 
     # -------------------------------------------------
     def _query_namespace(
@@ -61,6 +268,7 @@ class RAGClient:
         vector: List[float],
         namespace: str,
         top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """Query a specific namespace; return matches (may be empty)."""
         try:
@@ -68,13 +276,36 @@ class RAGClient:
                 namespace=namespace,
                 vector=vector,
                 top_k=top_k,
+                filter=metadata_filter,
                 include_metadata=True,
             )
             return res.get("matches", []) or []
         except Exception as e:
-            print(f"⚠️ Query failed for namespace '{namespace}': {e}")
+            log.warning("⚠️ Query failed for namespace '%s': %s", namespace, e)
             return []
 
+    # -------------------------------------------------
+    def _query_combined(self, vector: List[float]):
+        """
+        One query against the combined namespace, split client-side by
+        metadata["type"]. Over-fetches so one side rarely starves the other.
+        """
+        top_k = (self.top_k_medical + self.top_k_cultural) * COMBINED_OVERFETCH
+        matches = self._query_namespace(
+            vector,
+            self.combined_ns,
+            top_k,
+            {"type": {"$in": ["medical", "cultural"]}},
+        )
+        med, cult = [], []
+        for m in matches:
+            kind = (m.get("metadata", {}) or {}).get("type")
+            if kind == "medical" and len(med) < self.top_k_medical:
+                med.append(m)
+            elif kind == "cultural" and len(cult) < self.top_k_cultural:
+                cult.append(m)
+        return med, cult
+
     # -------------------------------------------------
     def _format_medical(self, matches: List[Dict[str, Any]]) -> List[str]:
         """
@@ -88,21 +319,16 @@ class RAGClient:
         for m in matches:
             meta = m.get("metadata", {}) or {}
             chunk_text = meta.get("text") or m.get("text") or ""
+            src = meta.get("source_file") or meta.get("doc_id") or ""
 
             if not chunk_text:
                 # Fallback (should be rare with correct indexing)
-                src = meta.get("source_file") or meta.get("doc_id") or "unknown source"
-                snippets.append(f"(No text) from {src}")
+                snippets.append(_MED_NO_TEXT(src=src or "unknown source"))
                 continue
 
-            src = meta.get("source_file") or meta.get("doc_id") or ""
             lang = meta.get("language") or ""
-            prefix = ""
-            if src or lang:
-                prefix = f"[{src} | {lang}] "
-
-            formatted = prefix + shorten(chunk_text, width=400, placeholder=" ...")
-            snippets.append(formatted)
+            tpl = _MED_WITH_SOURCE if (src or lang) else _MED_PLAIN
+            snippets.append(tpl(src=src, lang=lang, text=_truncate(chunk_text)))
 
         return snippets
 
@@ -123,7 +349,7 @@ class RAGClient:
             full_text = meta.get("text")
 
             if full_text:
-                snippets.append(shorten(full_text, width=400, placeholder=" ..."))
+                snippets.append(_truncate(full_text))
                 continue
 
             # Fallback: build from individual fields
@@ -149,15 +375,21 @@ class RAGClient:
                 parts.append(f"Guidance: {guidance}")
 
             if parts:
-                snippets.append(shorten(" | ".join(parts), width=400, placeholder=" ..."))
+                snippets.append(_truncate(" | ".join(parts)))
 
         return snippets
 
     # -------------------------------------------------
-    def retrieve_context(self, query_text: str) -> Dict[str, List[str]]:
+    def retrieve_context(
+        self,
+        query_text: str,
+        embedding: Optional[List[float]] = None,
+    ) -> Dict[str, List[str]]:
         """
         Main entrypoint:
-          - Embeds query
+          - Returns a cached result for a repeated query (no embedding call)
+          - Embeds query (unless a precomputed embedding is given)
+          - Returns a cached result for near-identical earlier queries
           - Queries both namespaces
           - Returns:
               {
@@ -168,24 +400,91 @@ class RAGClient:
         if not query_text or not query_text.strip():
             return {"medical": [], "cultural": []}
 
-        emb = self._embed(query_text)
-
-        med_matches = self._query_namespace(
-            emb, self.medical_ns, self.top_k_medical
-        )
-        cult_matches = self._query_namespace(
-            emb, self.cultural_ns, self.top_k_cultural
-        )
+        result_key = hashlib.blake2b(
+            self._normalize(query_text).encode("utf-8"), digest_size=16
+        ).digest()
+        with self._result_lock:
+            cached = self._result_cache.get(result_key)
+            if cached is not None:
+                self._result_cache.move_to_end(result_key)
+        if cached is not None:
+            log.debug("♻️ RAGClient: Exact cache hit → skipping embedding + Pinecone.")
+            return {k: list(v) for k, v in cached.items()}
+
+        emb = embedding if embedding is not None else self._embed(query_text)
+
+        unit = self._unit(emb)
+        cached = self._semantic_lookup(unit)
+        if cached is not None:
+            log.debug("♻️ RAGClient: Semantic cache hit → skipping Pinecone.")
+            self._result_cache_put(result_key, cached)
+            return cached
+
+        if self.combined_ns:
+            med_matches, cult_matches = self._query_combined(emb)
+        else:
+            # Both namespace queries are independent round-trips: run them together
+            f_med = _RAG_POOL.submit(
+                self._query_namespace, emb, self.medical_ns, self.top_k_medical
+            )
+            f_cult = _RAG_POOL.submit(
+                self._query_namespace, emb, self.cultural_ns, self.top_k_cultural
+            )
+            med_matches = f_med.result()
+            cult_matches = f_cult.result()
 
         medical_ctx = self._format_medical(med_matches)
         cultural_ctx = self._format_cultural(cult_matches)
 
-        print(
-            f"\n🔍 RAGClient: Retrieved {len(medical_ctx)} medical, "
-            f"{len(cultural_ctx)} cultural snippets."
+        log.debug(
+            "🔍 RAGClient: Retrieved %d medical, %d cultural snippets.",
+            len(medical_ctx), len(cultural_ctx),
         )
 
-        return {
+        result = {
             "medical": medical_ctx,
             "cultural": cultural_ctx,
         }
+        if medical_ctx or cultural_ctx:  # don't cache failed/empty lookups
+            self._semantic_store(unit, {k: list(v) for k, v in result.items()})
+            self._result_cache_put(result_key, result)
+        return result
+
+    def _result_cache_put(self, key: bytes, result: Dict[str, List[str]]) -> None:
+        with self._result_lock:
+            self._result_cache[key] = {k: list(v) for k, v in result.items()}
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+    # -------------------------------------------------
+    def retrieve_cultural_only(
+        self,
+        query_text: str,
+        embedding: Optional[List[float]] = None,
+    ) -> Dict[str, List[str]]:
+        """
+        Cultural-only retrieval for non-clinical messages.
+        Skips the medical namespace query entirely; "medical" is always empty.
+        """
+        if not query_text or not query_text.strip():
+            return {"medical": [], "cultural": []}
+
+        emb = embedding if embedding is not None else self._embed(query_text)
+
+        if self.combined_ns:
+            cult_matches = self._query_namespace(
+                emb, self.combined_ns, self.top_k_cultural, {"type": {"$eq": "cultural"}}
+            )
+        else:
+            cult_matches = self._query_namespace(
+                emb, self.cultural_ns, self.top_k_cultural
+            )
+        cultural_ctx = self._format_cultural(cult_matches)
+
+        log.debug("🔍 RAGClient: Retrieved %d cultural snippets (cultural only).", len(cultural_ctx))
+
+        return {
+            "medical": [],
+            "cultural": cultural_ctx,
+        }
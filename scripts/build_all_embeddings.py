@@ -13,29 +13,83 @@ Run this once to fully rebuild your embeddings.
 """
 
 import os
+import sys
 import json
 import time
+import queue
+import logging
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from tqdm import tqdm
-from openai import OpenAI
-from pinecone import Pinecone
+from openai import AsyncOpenAI, RateLimitError
+from pinecone import ServerlessSpec
 from dotenv import load_dotenv
 
+# Allow importing from project root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.clients import get_openai_client, get_pinecone
+from core.retrieval.rag_cache import RAG_CACHE_DB, RAGCacheStore
+
 # ================================================================
 # Setup
 # ================================================================
 load_dotenv()
+log = logging.getLogger(__name__)
+if __name__ == "__main__":
+    # Configure before ensure_index() runs below, so CLI progress still shows
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "agentic-med-hi-en")
+# If set, both datasets go into this one namespace (tagged by metadata["type"])
+PINECONE_COMBINED_NAMESPACE = os.getenv("PINECONE_COMBINED_NAMESPACE")
+PINECONE_CLOUD = os.getenv("PINECONE_CLOUD", "aws")
+PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
+# Vectors are stored unit-length, so dot product == cosine without re-normalizing
+PINECONE_METRIC = "dotproduct"
+EMBED_DIMENSION = 3072
 
 if not OPENAI_API_KEY or not PINECONE_API_KEY:
     raise ValueError("❌ Missing API keys in .env file.")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
+client = get_openai_client()
+pc = get_pinecone()
+
+
+def ensure_index():
+    """Create the index (dot-product metric) if missing; warn on a different metric."""
+    if PINECONE_INDEX_NAME not in pc.list_indexes().names():
+        log.info("🆕 Creating index '%s' (metric=%s)", PINECONE_INDEX_NAME, PINECONE_METRIC)
+        pc.create_index(
+            name=PINECONE_INDEX_NAME,
+            dimension=EMBED_DIMENSION,
+            metric=PINECONE_METRIC,
+            spec=ServerlessSpec(cloud=PINECONE_CLOUD, region=PINECONE_REGION),
+        )
+        return
+    metric = pc.describe_index(PINECONE_INDEX_NAME).metric
+    if metric != PINECONE_METRIC:
+        log.warning(
+            "⚠️ Index '%s' uses metric '%s'. Delete and re-run to get '%s' "
+            "(existing index left untouched).",
+            PINECONE_INDEX_NAME, metric, PINECONE_METRIC,
+        )
+
+
+ensure_index()
 index = pc.Index(PINECONE_INDEX_NAME)
 
+EMBED_MODEL = "text-embedding-3-large"
+EMBED_BATCH_SIZE = 256      # inputs per embeddings request
+EMBED_MAX_IN_FLIGHT = 5     # concurrent embeddings requests
+MAX_RETRIES = 5
+UPSERT_MAX_WORKERS = 16     # concurrent Pinecone upserts
+
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 
@@ -43,48 +97,200 @@ DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 # Helpers
 # ================================================================
 
-def embed_texts(texts, model="text-embedding-3-large"):
-    """Generate embeddings for a list of texts."""
-    response = client.embeddings.create(model=model, input=texts)
-    embeddings = [d.embedding for d in response.data]
-    return embeddings
+def unit_rows(embeddings):
+    """L2-normalize each embedding (float32) so stored vectors are unit length."""
+    mat = np.asarray(embeddings, dtype=np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+    return mat.tolist()
+
+
+def embed_texts(texts, model=EMBED_MODEL):
+    """Generate embeddings for a list of texts (retrying on rate limits)."""
+    delay = 1.0
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = client.embeddings.create(model=model, input=texts)
+            break
+        except RateLimitError:
+            if attempt == MAX_RETRIES - 1:
+                raise
+        time.sleep(delay + random.uniform(0, delay / 2))
+        delay *= 2
+    return unit_rows([d.embedding for d in response.data])
+
+
+async def _embed_all_async(texts, model, batch_size, max_in_flight, desc):
+    """Embed `texts` in batches with up to `max_in_flight` requests at once."""
+    results = [None] * len(texts)
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async with AsyncOpenAI(api_key=OPENAI_API_KEY) as aclient:
+
+        async def _batch(start):
+            batch = texts[start:start + batch_size]
+            delay = 1.0
+            for attempt in range(MAX_RETRIES):
+                try:
+                    async with semaphore:
+                        response = await aclient.embeddings.create(model=model, input=batch)
+                    break
+                except RateLimitError:
+                    if attempt == MAX_RETRIES - 1:
+                        raise
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay *= 2
+            # Slot results by position so output order matches input order
+            results[start:start + len(batch)] = unit_rows([d.embedding for d in response.data])
+            progress.update(len(batch))
+
+        with tqdm(total=len(texts), desc=desc) as progress:
+            await asyncio.gather(*(_batch(i) for i in range(0, len(texts), batch_size)))
+
+    return results
+
+
+def embed_all(texts, model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE,
+              max_in_flight=EMBED_MAX_IN_FLIGHT, desc="Embedding"):
+    """Embed many texts with concurrent, rate-limit-aware batched requests."""
+    if not texts:
+        return []
+    return asyncio.run(_embed_all_async(texts, model, batch_size, max_in_flight, desc))
 
 
 def chunk_text(text, chunk_size=600, overlap=100):
     """Simple character-based chunking with overlap."""
-    chunks, start = [], 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        if len(chunk.strip()) > 50:
-            chunks.append(chunk.strip())
-        start += chunk_size - overlap
-    return chunks
-
-
-def batch_upsert(vectors, namespace, batch_size=64, delay=0.5):
-    """Upload vectors to Pinecone in batches."""
-    for i in range(0, len(vectors), batch_size):
-        batch = vectors[i:i+batch_size]
-        index.upsert(vectors=batch, namespace=namespace)
-        print(f"  → Upserted batch of {len(batch)} into '{namespace}'")
-        time.sleep(delay)
+    step = chunk_size - overlap
+    chunks = [text[start:start + chunk_size].strip() for start in range(0, len(text), step)]
+    return [c for c in chunks if len(c) > 50]
+
+
+def _is_rate_limited(e):
+    """True for Pinecone 429s (REST status or gRPC RESOURCE_EXHAUSTED)."""
+    return getattr(e, "status", None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def _retry_after(e, default):
+    """Seconds from a Retry-After header if the error carries one, else `default`."""
+    headers = getattr(e, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def upsert_with_retry(batch, namespace):
+    """Upsert one batch; back off only when Pinecone actually rate-limits us."""
+    delay = 1.0
+    for attempt in range(MAX_RETRIES):
+        try:
+            index.upsert(vectors=batch, namespace=namespace)
+            break
+        except Exception as e:
+            if not _is_rate_limited(e) or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(_retry_after(e, delay + random.uniform(0, delay / 2)))
+            delay *= 2
+    log.debug("  → Upserted batch of %d into '%s'", len(batch), namespace)
+    return len(batch)
+
+
+def batch_upsert(vectors, namespace, batch_size=64, max_workers=UPSERT_MAX_WORKERS):
+    """One-shot upload of `vectors` in batches, up to `max_workers` upserts in flight."""
+    batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return sum(pool.map(lambda b: upsert_with_retry(b, namespace), batches))
+
+
+def embed_and_upsert_pipeline(batches, namespace, desc="Embedding",
+                              upsert_batch_size=64, queue_size=4):
+    """
+    Three-stage pipeline: reader → embedders → upserter, linked by bounded
+    queues so only a few batches are in memory at once and embedding calls
+    overlap with Pinecone upserts. The upserter fans slices out to one shared
+    pool (UPSERT_MAX_WORKERS upserts in flight across batches).
+    `batches` yields lists of {"id", "metadata"} dicts; metadata["text"] is embedded.
+    Returns the number of vectors upserted.
+    """
+    embed_q = queue.Queue(maxsize=queue_size)
+    upsert_q = queue.Queue(maxsize=queue_size)
+    errors = []
+    upserted = [0]
+    progress = tqdm(desc=desc, unit="chunk")
+    upsert_pool = ThreadPoolExecutor(max_workers=UPSERT_MAX_WORKERS)
+    in_flight = threading.Semaphore(2 * UPSERT_MAX_WORKERS)  # queued + running slices
+    done_lock = threading.Lock()
+
+    def reader():
+        try:
+            for batch in batches:
+                if errors:
+                    break
+                embed_q.put(batch)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(EMBED_MAX_IN_FLIGHT):
+                embed_q.put(None)
+
+    def embedder():
+        while (batch := embed_q.get()) is not None:
+            if errors:
+                continue  # keep draining so the reader never blocks
+            try:
+                embeddings = embed_texts([c["metadata"]["text"] for c in batch])
+                upsert_q.put([
+                    {"id": c["id"], "values": emb, "metadata": c["metadata"]}
+                    for c, emb in zip(batch, embeddings)
+                ])
+            except Exception as e:
+                errors.append(e)
+
+    def on_upserted(future):
+        in_flight.release()
+        with done_lock:
+            if future.exception() is not None:
+                errors.append(future.exception())
+            else:
+                upserted[0] += future.result()
+                progress.update(future.result())
+
+    def upserter():
+        while (vectors := upsert_q.get()) is not None:
+            for i in range(0, len(vectors), upsert_batch_size):
+                if errors:
+                    break  # keep draining so the embedders never block
+                in_flight.acquire()
+                future = upsert_pool.submit(
+                    upsert_with_retry, vectors[i:i + upsert_batch_size], namespace
+                )
+                future.add_done_callback(on_upserted)
+
+    embedders = [threading.Thread(target=embedder) for _ in range(EMBED_MAX_IN_FLIGHT)]
+    upsert_thread = threading.Thread(target=upserter)
+    reader_thread = threading.Thread(target=reader)
+    for t in (upsert_thread, *embedders, reader_thread):
+        t.start()
+
+    reader_thread.join()
+    for t in embedders:
+        t.join()
+    upsert_q.put(None)
+    upsert_thread.join()
+    upsert_pool.shutdown(wait=True)
+    progress.close()
+
+    if errors:
+        raise errors[0]
+    return upserted[0]
 
 
 # ================================================================
 # 1️⃣ Bilingual Medical Embeddings
 # ================================================================
 
-def build_bilingual_embeddings():
-    file_path = os.path.join(DATA_DIR, "preprocessed", "bilingual_clean.jsonl")
-    namespace = "bilingual_medical_clean"
-
-    if not os.path.exists(file_path):
-        print(f"❌ Missing file: {file_path}")
-        return
-
-    print(f"\n🩺 Building embeddings for bilingual medical docs → {namespace}")
-    all_chunks = []
+def iter_bilingual_batches(file_path, batch_size=EMBED_BATCH_SIZE):
+    """Stream chunk dicts from the preprocessed JSONL in lists of batch_size."""
+    batch = []
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
             if not line.strip():
@@ -93,62 +299,85 @@ def build_bilingual_embeddings():
             doc_id = doc.get("id")
             src = doc.get("source_file")
 
-            for lang in ["english", "hindi"]:
+            # One pass per doc; chunk text is stored once, in metadata
+            for lang in ("english", "hindi"):
                 text = doc.get(lang, "")
                 if not text.strip():
                     continue
-
-                chunks = chunk_text(text)
-                for i, chunk in enumerate(chunks):
-                    all_chunks.append({
+                for i, chunk in enumerate(chunk_text(text)):
+                    batch.append({
                         "id": f"{doc_id}_{lang}_{i}",
-                        "text": chunk,
                         "metadata": {
                             "doc_id": doc_id,
                             "source_file": src,
                             "language": lang,
                             "chunk_index": i,
-                            "text": chunk  # ✅ store text
+                            "type": "medical",
+                            "text": chunk,
                         }
                     })
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+    if batch:
+        yield batch
+
+
+def build_bilingual_embeddings():
+    file_path = os.path.join(DATA_DIR, "preprocessed", "bilingual_clean.jsonl")
+    namespace = PINECONE_COMBINED_NAMESPACE or "bilingual_medical_clean"
+
+    if not os.path.exists(file_path):
+        log.error("❌ Missing file: %s", file_path)
+        return
 
-    print(f"📄 Prepared {len(all_chunks):,} text chunks.")
-    all_vectors = []
-
-    for i in tqdm(range(0, len(all_chunks), 64), desc="Embedding bilingual docs"):
-        batch = all_chunks[i:i+64]
-        texts = [c["text"] for c in batch]
-        embeddings = embed_texts(texts)
-        vectors = [
-            {
-                "id": batch[j]["id"],
-                "values": embeddings[j],
-                "metadata": batch[j]["metadata"]
-            }
-            for j in range(len(batch))
-        ]
-        all_vectors.extend(vectors)
-
-    batch_upsert(all_vectors, namespace)
+    log.info("🩺 Building embeddings for bilingual medical docs → %s", namespace)
+    total = embed_and_upsert_pipeline(
+        iter_bilingual_batches(file_path), namespace, desc="Embedding bilingual docs"
+    )
+    log.info("📄 Embedded and upserted %s text chunks.", f"{total:,}")
 
     stats = index.describe_index_stats()
     ns = stats.get("namespaces", {}).get(namespace, {})
-    print(f"✅ Finished: {ns.get('vector_count', 0)} vectors in '{namespace}'")
+    log.info("✅ Finished: %s vectors in '%s'", ns.get("vector_count", 0), namespace)
 
 
 # ================================================================
 # 2️⃣ Cultural Semantics Embeddings
 # ================================================================
 
+CULTURAL_TEXT_TEMPLATE = (
+    "{expression_native} ({expression_translit}) {literal_translation} "
+    "{clinical_meaning} {cultural_context} {category} "
+    "Risk flag: {risk_flag} Translation guidance: {translation_guidelines}"
+)
+CULTURAL_TEXT_DEFAULTS = {
+    "expression_native": "",
+    "expression_translit": "",
+    "literal_translation": "",
+    "clinical_meaning": "",
+    "cultural_context": "",
+    "category": "",
+    "risk_flag": False,
+    "translation_guidelines": "",
+}
+
+
+def cultural_text(entry):
+    """Embedding text for one entry: one template fill, blanks collapsed."""
+    fields = {k: entry.get(k, d) or d for k, d in CULTURAL_TEXT_DEFAULTS.items()}
+    return " ".join(CULTURAL_TEXT_TEMPLATE.format_map(fields).split())
+
+
 def build_cultural_embeddings():
     file_path = os.path.join(DATA_DIR, "cultural_semantics", "data.json")
-    namespace = "cultural_semantics"
+    namespace = PINECONE_COMBINED_NAMESPACE or "cultural_semantics"
 
     if not os.path.exists(file_path):
-        print(f"❌ Missing file: {file_path}")
+        log.error("❌ Missing file: %s", file_path)
         return
 
-    print(f"\n🎭 Building embeddings for cultural semantics → {namespace}")
+    log.info("🎭 Building embeddings for cultural semantics → %s", namespace)
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
@@ -156,20 +385,9 @@ def build_cultural_embeddings():
     vectors = []
 
     for e in entries:
-        text_parts = [
-            e.get("expression_native", ""),
-            f"({e.get('expression_translit', '')})",
-            e.get("literal_translation", ""),
-            e.get("clinical_meaning", ""),
-            e.get("cultural_context", ""),
-            e.get("category", ""),
-            f"Risk flag: {e.get('risk_flag', False)}",
-            f"Translation guidance: {e.get('translation_guidelines', '')}"
-        ]
-        full_text = " ".join([t for t in text_parts if t])
-
-        metadata = {k: v for k, v in e.items() if k != "entries"}
-        metadata["text"] = full_text
+        metadata = dict(e)
+        metadata["text"] = cultural_text(e)
+        metadata["type"] = "cultural"
 
         vectors.append({
             "id": e.get("id", f"entry_{len(vectors)}"),
@@ -177,29 +395,32 @@ def build_cultural_embeddings():
             "metadata": metadata
         })
 
-    print(f"📜 Prepared {len(vectors):,} cultural entries for embedding.")
+    log.info("📜 Prepared %d cultural entries for embedding.", len(vectors))
 
-    # Batch embed
-    for i in tqdm(range(0, len(vectors), 64), desc="Embedding cultural semantics"):
-        batch = vectors[i:i+64]
-        texts = [v["metadata"]["text"] for v in batch]
-        embeddings = embed_texts(texts)
-        for j in range(len(batch)):
-            batch[j]["values"] = embeddings[j]
-        index.upsert(vectors=batch, namespace=namespace)
-        time.sleep(0.5)
+    # Batch embed, then upsert concurrently
+    embeddings = embed_all(
+        [v["metadata"]["text"] for v in vectors], desc="Embedding cultural semantics"
+    )
+    for v, emb in zip(vectors, embeddings):
+        v["values"] = emb
+    batch_upsert(vectors, namespace)
 
     stats = index.describe_index_stats()
     ns = stats.get("namespaces", {}).get(namespace, {})
-    print(f"✅ Finished: {ns.get('vector_count', 0)} vectors in '{namespace}'")
+    log.info("✅ Finished: %s vectors in '%s'", ns.get("vector_count", 0), namespace)
 
 
 # ================================================================
 # Main Runner
 # ================================================================
 if __name__ == "__main__":
-    print("\n🚀 Starting full embedding rebuild...\n")
+    log.info("🚀 Starting full embedding rebuild...")
     build_bilingual_embeddings()
     build_cultural_embeddings()
 
-    print("\n🎉 All embeddings rebuilt successfully!\n")
+    # Cached retrieval results point at the old vectors: drop them
+    if os.path.exists(RAG_CACHE_DB):
+        RAGCacheStore(RAG_CACHE_DB).clear_semantic()
+        log.info("🧹 Cleared semantic retrieval cache in %s", RAG_CACHE_DB)
+
+    log.info("🎉 All embeddings rebuilt successfully!")
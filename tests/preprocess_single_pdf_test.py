@@ -7,6 +7,7 @@ and outputs one structured JSON record ready for embedding.
 import os
 import re
 import json
+import hashlib
 import unicodedata
 import fitz  # PyMuPDF
 from tqdm import tqdm
@@ -17,6 +18,8 @@ from tqdm import tqdm
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 PDF_PATH = os.path.join(BASE_DIR, "data", "bilingual", "24HourUrine_Hindi.pdf")
 OUTPUT_PATH = os.path.join(BASE_DIR, "data", "preprocessed", "24HourUrine_clean_test.jsonl")
+# Raw PyMuPDF blocks per PDF, so re-runs only redo normalization
+PDF_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_blocks")
 
 os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
@@ -24,54 +27,83 @@ os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 # Helpers
 # ===============================================================
 
+NOISE_PATTERNS = [
+    r'www\.[A-Za-z0-9./_-]+',
+    r'reproductive health access project',
+    r'healthinfotranslations\.org',
+    r'page \d+ of \d+',
+    r'©.*\d{4}',  # copyright
+]
+
+# Compiled once; all noise patterns removed in a single pass
+_NOISE_RE = re.compile("|".join(f"(?:{p})" for p in NOISE_PATTERNS), re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+_HI_RE = re.compile(r'[\u0900-\u097F]')
+_EN_RE = re.compile(r'[A-Za-z]')
+
+
 def normalize_text(text: str) -> str:
     """Clean, normalize, lowercase, and remove extra noise."""
     if not text:
         return ""
-    text = unicodedata.normalize("NFC", text)
-    text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
+    text = _WS_RE.sub(' ', unicodedata.normalize("NFC", text).lower())
     text = text.replace("–", "-").replace("•", "-")
-    noise_patterns = [
-        r'www\.[A-Za-z0-9./_-]+',
-        r'reproductive health access project',
-        r'healthinfotranslations\.org',
-        r'page \d+ of \d+',
-        r'©.*\d{4}',  # copyright
-    ]
-    for pat in noise_patterns:
-        text = re.sub(pat, '', text, flags=re.IGNORECASE)
-    return text.strip()
+    return _NOISE_RE.sub('', text).strip()
 
 
 def detect_language(text: str) -> str:
     """Detect if a text block is English or Hindi."""
-    if re.search(r'[\u0900-\u097F]', text):
+    if _HI_RE.search(text):
         return "hi"
-    elif re.search(r'[A-Za-z]', text):
+    elif _EN_RE.search(text):
         return "en"
     else:
         return "other"
 
 
-def extract_text_by_language(pdf_path: str):
-    """Extract text and separate all English and Hindi content."""
-    doc = fitz.open(pdf_path)
-    english_blocks, hindi_blocks = [], []
+def _pdf_cache_path(pdf_path: str) -> str:
+    """Cache file for a PDF, keyed by its first 64KB + size + mtime."""
+    st = os.stat(pdf_path)
+    with open(pdf_path, "rb") as f:
+        head = f.read(65536)
+    key = hashlib.sha256(head + f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+    return os.path.join(PDF_CACHE_DIR, f"{key}.json")
+
+
+def extract_raw_blocks(pdf_path: str):
+    """Raw text blocks of every page (PyMuPDF layout pass cached on disk)."""
+    cache_path = _pdf_cache_path(pdf_path)
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
+    doc = fitz.open(pdf_path)
+    raw_blocks = []
     for page in tqdm(doc, desc="Extracting text"):
-        blocks = page.get_text("blocks")
-        for b in blocks:
+        for b in page.get_text("blocks"):
             _, _, _, _, text, *_ = b
-            if not text or len(text.strip()) < 3:
-                continue
-            text = normalize_text(text)
-            lang = detect_language(text)
-            if lang == "en":
-                english_blocks.append(text)
-            elif lang == "hi":
-                hindi_blocks.append(text)
+            raw_blocks.append(text)
     doc.close()
+
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(raw_blocks, f, ensure_ascii=False)
+    return raw_blocks
+
+
+def extract_text_by_language(pdf_path: str):
+    """Extract text and separate all English and Hindi content."""
+    english_blocks, hindi_blocks = [], []
+
+    for text in extract_raw_blocks(pdf_path):
+        if not text or len(text.strip()) < 3:
+            continue
+        text = normalize_text(text)
+        lang = detect_language(text)
+        if lang == "en":
+            english_blocks.append(text)
+        elif lang == "hi":
+            hindi_blocks.append(text)
     return " ".join(english_blocks), " ".join(hindi_blocks)
 
 
@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Allow importing from project root
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+from core.agents.intent_classifier import IntentClassifier, _normalize
+
+
+def prefilter(message):
+    return IntentClassifier._prefilter(_normalize(message))
+
+
+def test_prefilter_medical_terms():
+    for message in [
+        "I have chest pain since morning",
+        "मेरे सीने में दर्द है",
+        "मुझे बुखार है।",
+        "क्या मैं यह दवा ले सकता हूँ?",
+    ]:
+        assert prefilter(message) == ("medical_required", 0.9), message
+
+
+def test_prefilter_hindi_substrings_are_not_medical():
+    # दिल inside दिल्ली, सिर inside सिर्फ — must not short-circuit as medical
+    for message in [
+        "मैं दिल्ली में रहता हूँ",
+        "आपका कमरा कहाँ है",
+        "सिर्फ धन्यवाद",
+    ]:
+        assert prefilter(message) is None, message
+
+
+def test_prefilter_ambiguous_english_goes_to_llm():
+    for message in [
+        "I'll be back tomorrow",
+        "Please head to reception",
+        "It's cold outside",
+    ]:
+        assert prefilter(message) is None, message
+
+
+def test_prefilter_greetings():
+    for message in ["Hello!", "thank you doctor", "नमस्ते जी"]:
+        assert prefilter(message) == ("not_required", 0.95), message
+
+
+if __name__ == "__main__":
+    test_prefilter_medical_terms()
+    test_prefilter_hindi_substrings_are_not_medical()
+    test_prefilter_ambiguous_english_goes_to_llm()
+    test_prefilter_greetings()
+    print("✅ Intent prefilter tests passed")
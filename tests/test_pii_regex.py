@@ -0,0 +1,106 @@
+import os
+import sys
+
+# Allow importing from project root
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+import core.pii.pii_agent as pii_agent
+from core.pii.pii_agent import PIIAnonymizer
+
+
+# -------------------------------------------------
+# Stub spaCy: these tests cover the regex detectors, overlap merge and
+# replacement, not the NER model. PERSON spans come from PERSONS below.
+# -------------------------------------------------
+PERSONS = ["John Smith", "John.Smith"]
+
+
+class _Ent:
+    label_ = "PERSON"
+
+    def __init__(self, text, start):
+        self.text = text
+        self.start_char = start
+        self.end_char = start + len(text)
+
+
+class _Doc:
+    def __init__(self, text):
+        self.ents = tuple(_Ent(p, text.find(p)) for p in PERSONS if p in text)
+
+
+class _StubNLP:
+    def __call__(self, text):
+        return _Doc(text)
+
+    def pipe(self, texts, **kwargs):
+        return (_Doc(t) for t in texts)
+
+
+pii_agent.get_nlp_en = lambda: _StubNLP()
+
+
+def values(result, ent_type):
+    return [e.value for e in result.entities if e.type == ent_type]
+
+
+def test_phone_and_age_in_one_sentence():
+    result = PIIAnonymizer().deidentify("I am 34 years old, call me at +91 98765 43210.")
+    assert result.deidentified_text == "I am [AGE_1] years old, call me at [PHONE_1]."
+    assert values(result, "age") == ["34"]
+    assert values(result, "phone") == ["+91 98765 43210"]
+
+
+def test_hindi_name_and_age():
+    result = PIIAnonymizer().deidentify("मेरा नाम प्रिंस प्रवीन है, मैं 26 साल का हूँ।")
+    assert result.deidentified_text == "मेरा नाम [NAME_1] है, मैं [AGE_1] साल का हूँ।"
+    assert values(result, "name") == ["प्रिंस प्रवीन"]
+    assert values(result, "age") == ["26"]
+
+
+def test_email():
+    result = PIIAnonymizer().deidentify("Please write to ravi.k@example.com today")
+    assert result.deidentified_text == "Please write to [EMAIL_1] today"
+
+
+def test_same_span_detectors_replace_once():
+    # Both English age patterns capture "26": baseline produced "[AGE_[AGE_2]"
+    result = PIIAnonymizer().deidentify("I am 26 years old and have chest pain")
+    assert result.deidentified_text == "I am [AGE_1] years old and have chest pain"
+    assert len(result.entities) == 1
+
+
+def test_overlapping_spans_longest_wins():
+    # Digits inside the email must not also become a phone; a PERSON span
+    # inside an email is swallowed by the longer email span
+    anonymizer = PIIAnonymizer()
+    result = anonymizer.deidentify("mail ravi9876543210@example.com or call 9876543210")
+    assert result.deidentified_text == "mail [EMAIL_1] or call [PHONE_1]"
+
+    result = anonymizer.deidentify("Email John.Smith@example.com")
+    assert result.deidentified_text == "Email [EMAIL_2]"
+    assert [e.type for e in result.entities] == ["email"]
+
+
+def test_batch_matches_single():
+    texts = [
+        "My name is John Smith and I am 45 years old.",
+        "मेरा नाम प्रिंस प्रवीन है, मैं 26 साल का हूँ और मेरा मोबाइल 9876543210 है।",
+        "no pii here",
+        "Contact John Smith at john@example.com or 98765-43210",
+    ]
+    single = PIIAnonymizer()
+    expected = [single.deidentify(t).to_dict() for t in texts]
+    batch = [r.to_dict() for r in PIIAnonymizer().deidentify_batch(texts)]
+    assert batch == expected
+
+
+if __name__ == "__main__":
+    test_phone_and_age_in_one_sentence()
+    test_hindi_name_and_age()
+    test_email()
+    test_same_span_detectors_replace_once()
+    test_overlapping_spans_longest_wins()
+    test_batch_matches_single()
+    print("✅ PII regex tests passed")
@@ -7,23 +7,20 @@ Smartly prints metadata for both:
 """
 
 import os
+import sys
 from textwrap import shorten
-from openai import OpenAI
-from pinecone import Pinecone
-from dotenv import load_dotenv
 
-# ===============================================================
-# Config
-# ===============================================================
-load_dotenv()
+# Allow importing from project root
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+from core.clients import get_index, get_openai_client
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+# ===============================================================
+# Shared clients
+# ===============================================================
+client = get_openai_client()
+index = get_index()
 
 # ===============================================================
 # Helpers
@@ -1,20 +1,18 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-from pinecone import Pinecone
+import sys
 from textwrap import shorten
 
+# Allow importing from project root
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+from core.clients import get_index, get_openai_client
+
 # =====================================
-# Load env
+# Shared clients
 # =====================================
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+client = get_openai_client()
+index = get_index()
 
 # =====================================
 # Helper